@@ -11,11 +11,15 @@ warnings.filterwarnings("ignore", category=DeprecationWarning)
 warnings.filterwarnings("ignore", category=UserWarning)
 
 import os
+import re
 import sys
-import json
+import uuid
 import asyncio
+import logging
 
+import orjson
 import uvicorn
+import aiofiles.os
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
@@ -23,7 +27,7 @@ from fastapi.staticfiles import StaticFiles
 # Ensure backend directory is on the import path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from models import CalyxState, ConversationContext, UserProfile, LocationStore
+from models import CalyxState, UserProfile, LocationStore
 from services import (
     DeepgramService,
     GroqService,
@@ -31,8 +35,22 @@ from services import (
     TwilioPhoneService,
     GuardianRelay,
     EvidenceVault,
+    warm_up_groq,
+    warm_up_murf,
+    SIGNAL_CALL,
+    SIGNAL_TIMER,
+    SIGNAL_SAFE,
+    get_deepgram_client,
+    close_http_client,
 )
 
+# Service modules log through the "services" logger; LOG_LEVEL=DEBUG adds
+# per-sentence TTS timings
+_service_log = logging.getLogger("services")
+_service_log.addHandler(logging.StreamHandler(sys.stdout))
+_service_log.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+_service_log.propagate = False
+
 app = FastAPI(title="Calyx", description="Emotionally Adaptive Crisis Companion")
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -43,78 +61,159 @@ os.makedirs(STATIC_DIR, exist_ok=True)
 
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
-calyx_state = CalyxState()
-relay = GuardianRelay(calyx_state)
 vault = EvidenceVault()
 
-# Pre-cached phone intro audio (generated at startup for instant playback)
-PHONE_INTRO_AUDIO = None
+# Browser sessions by id, so the Twilio call a session places can find the
+# incident it is calling about. A closed session stays here until its SOS
+# countdown and call are over.
+SESSIONS = {}
+# How long a closed session waits for its placed call to connect. Twilio stops
+# ringing after 60 s, and an unanswered call never opens a stream to clear it.
+CALL_CONNECT_SECONDS = 90
+
+
+def release_session(session_id: str):
+    """Forget a session once its socket is closed and no call needs its state."""
+    state = SESSIONS.get(session_id)
+    if not state or state.session_open:
+        return
+    if not state.call_active:
+        del SESSIONS[session_id]
+    else:
+        asyncio.get_running_loop().call_later(CALL_CONNECT_SECONDS, SESSIONS.pop, session_id, None)
+
+
+def close_session(session_id: str, *tasks: asyncio.Task):
+    """Mark a browser session closed, keeping it while a task may still call.
+
+    `tasks` are the session's SOS countdown and inactivity timer; the session
+    is re-checked once all pending ones have finished or been cancelled.
+    """
+    state = SESSIONS.get(session_id)
+    if state:
+        state.session_open = False
+    pending = [task for task in tasks if task and not task.done()]
+
+    def on_done(_):
+        if all(task.done() for task in pending):
+            release_session(session_id)
+
+    for task in pending:
+        task.add_done_callback(on_done)
+    if not pending:
+        release_session(session_id)
+
+
+# Transcript trigger words, found in one pass instead of one lower() + scan
+# each. Substring matches, like the checks they replace ("unsafe" has "safe").
+_TRIGGER_RE = re.compile(r"end session|safe|call|contact|now|please|cancel")
+_CALL_ASK_WORDS = frozenset(("contact", "now", "please"))
+
+
+def _dumps(payload) -> str:
+    """Serialize a control message for send_text (text frames carry JSON, binary frames audio)."""
+    return orjson.dumps(payload).decode()
+
+
+def trigger_words(text: str) -> set:
+    return set(_TRIGGER_RE.findall(text.lower()))
+
+
+def asks_for_call(words: set) -> bool:
+    return "call" in words and not _CALL_ASK_WORDS.isdisjoint(words)
+
+
+# Fixed lines of the phone briefing, pre-synthesized at startup and stored as
+# mulaw/base64 payloads for instant playback; only the incident details in
+# between are synthesized per call
+PHONE_INTRO_TEXT = "Hello, this is Calyx, an AI safety companion. I'm calling to alert you about an emergency. Please hold on."
+PHONE_CLOSING_TEXT = "I've sent you a text with their location. How can I help you help them?"
+PHONE_INTRO_PAYLOADS = []
+PHONE_CLOSING_PAYLOADS = []
+# Frontend page, read once at startup instead of from disk per request
+INDEX_HTML = None
 
 
 @app.get("/")
 async def get():
-    index_path = os.path.join(FRONTEND_DIR, "index.html")
-    if os.path.exists(index_path):
-        with open(index_path, "r", encoding="utf-8") as f:
-            return HTMLResponse(content=f.read())
+    if INDEX_HTML is not None:
+        return HTMLResponse(content=INDEX_HTML)
     return HTMLResponse(content="Error: index.html not found.", status_code=500)
 
 
 @app.get("/download/{filename}")
 async def download_file(filename: str):
     file_location = os.path.join(STATIC_DIR, filename)
-    if os.path.exists(file_location):
-        return FileResponse(file_location, filename=filename)
+    if await aiofiles.os.path.exists(file_location):
+        return FileResponse(file_location, media_type="application/pdf", filename=filename)
     return {"error": "File not found"}
 
 
 @app.on_event("startup")
 async def startup_event():
-    global PHONE_INTRO_AUDIO
+    global INDEX_HTML
     print("[STARTUP] Calyx Safety Agent initialized")
     print("[STARTUP] Pipeline: Deepgram Nova-2 -> Groq Llama 3.1 -> Murf Falcon")
+    print(f"[STARTUP] Event loop: {type(asyncio.get_running_loop()).__module__}")
 
-    # Pre-warm Groq connection pool
-    try:
-        print("[STARTUP] Warming up Groq LLM...")
-        from groq import AsyncGroq
-        groq_client = AsyncGroq()
-        await groq_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": "hi"}],
-            max_tokens=1
-        )
-        print("[STARTUP] Groq LLM warmed up")
-    except Exception as e:
-        print(f"[STARTUP] Groq warmup failed (will work on first request): {e}")
+    index_path = os.path.join(FRONTEND_DIR, "index.html")
+    if os.path.exists(index_path):
+        with open(index_path, "rb") as f:
+            INDEX_HTML = f.read()
+    else:
+        print(f"[STARTUP] Frontend not found: {index_path}")
 
     # Verify Deepgram API key
     try:
         dg_key = os.getenv("DEEPGRAM_API_KEY")
         if dg_key and len(dg_key) > 10:
+            # Build the shared client now rather than inside the first session
+            get_deepgram_client()
             print("[STARTUP] Deepgram API key verified")
         else:
             print("[STARTUP] WARNING: Deepgram API key missing or invalid!")
     except Exception as e:
         print(f"[STARTUP] Deepgram check failed: {e}")
 
+    # Pre-warm Groq connection pool
+    async def warm_groq():
+        try:
+            print("[STARTUP] Warming up Groq LLM...")
+            await warm_up_groq()
+            print("[STARTUP] Groq LLM warmed up")
+        except Exception as e:
+            print(f"[STARTUP] Groq warmup failed (will work on first request): {e}")
+
     # Pre-generate phone intro audio for instant playback
-    try:
-        print("[STARTUP] Pre-generating phone intro audio...")
-        temp_state = CalyxState()
-        tts = MurfService(temp_state)
-        intro_text = "Hello, this is Calyx, an AI safety companion. I'm calling to alert you about an emergency. Please hold on."
-        async for chunk in tts.generate_phone_audio(intro_text):
-            PHONE_INTRO_AUDIO = chunk
-            break
-        await tts.close()
-        print("[STARTUP] Phone intro audio cached")
-    except Exception as e:
-        print(f"[STARTUP] Could not pre-cache intro audio: {e}")
+    async def cache_phone_intro():
+        global PHONE_INTRO_PAYLOADS, PHONE_CLOSING_PAYLOADS
+        try:
+            print("[STARTUP] Pre-generating phone intro audio...")
+            temp_state = CalyxState()
+            tts = MurfService(temp_state)
+
+            async def encode(text):
+                return [TwilioPhoneService.encode_payload(chunk) async for chunk in tts.generate_phone_audio(text)]
+
+            PHONE_INTRO_PAYLOADS, PHONE_CLOSING_PAYLOADS = await asyncio.gather(
+                encode(PHONE_INTRO_TEXT), encode(PHONE_CLOSING_TEXT)
+            )
+            print("[STARTUP] Phone intro audio cached")
+        except Exception as e:
+            print(f"[STARTUP] Could not pre-cache intro audio: {e}")
+
+    # Independent network round trips: startup waits for the slower one only
+    await asyncio.gather(warm_groq(), cache_phone_intro())
 
     print("[STARTUP] Ready to accept connections")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_http_client()
+    print("[SHUTDOWN] HTTP connection pool closed")
+
+
 # ---------------------------------------------------------------------------
 # WebSocket: Browser client
 # ---------------------------------------------------------------------------
@@ -123,11 +222,20 @@ async def startup_event():
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
 
-    # Reset state for new session
-    calyx_state.conversation_context = ConversationContext()
-    calyx_state.mode = "DEFAULT"
-    calyx_state.call_active = False
-    print(">>> [SESSION] New session started")
+    session_id = uuid.uuid4().hex
+    calyx_state = CalyxState()
+    relay = GuardianRelay(calyx_state, session_id)
+    SESSIONS[session_id] = calyx_state
+    print(f">>> [SESSION] New session started ({session_id[:8]})")
+
+    # The pooled Murf connection may have idled out since startup or the last
+    # session; reopen it while the user is still getting started
+    async def warm_tts():
+        try:
+            await warm_up_murf()
+        except Exception as e:
+            print(f"[MURF] Warmup failed: {e}")
+    warm_task = asyncio.create_task(warm_tts())
 
     dg_service = DeepgramService(calyx_state)
     groq_service = GroqService(calyx_state)
@@ -164,7 +272,7 @@ async def websocket_endpoint(websocket: WebSocket):
         await relay.trigger_emergency_protocol(contacts if contacts else None)
         if websocket_open:
             contact_count = len(contacts) if contacts else 1
-            await websocket.send_text(json.dumps({
+            await websocket.send_text(_dumps({
                 "type": "alert_sent",
                 "message": f"Calling {contact_count} contact(s)...",
                 "contacts": contact_count
@@ -177,14 +285,14 @@ async def websocket_endpoint(websocket: WebSocket):
             timer_cancelled = False
             print(f">>> [TIMER] {seconds}s Timer Started - Reason: {reason}")
             if websocket_open:
-                await websocket.send_text(json.dumps({"type": "timer_started", "seconds": seconds}))
+                await websocket.send_text(_dumps({"type": "timer_started", "seconds": seconds}))
             await asyncio.sleep(seconds)
             if not timer_cancelled:
                 await trigger_call(reason)
         except asyncio.CancelledError:
             timer_cancelled = True
             if websocket_open:
-                await websocket.send_text(json.dumps({"type": "timer_cancelled"}))
+                await websocket.send_text(_dumps({"type": "timer_cancelled"}))
 
     # -- Helper: inactivity detection --
     async def start_inactivity_timer():
@@ -207,18 +315,89 @@ async def websocket_endpoint(websocket: WebSocket):
                 pass
         inactivity_task = asyncio.create_task(start_inactivity_timer())
 
+    # -- Helpers for AI signals --
+    def restart_countdown():
+        nonlocal sos_task
+        if sos_task and not sos_task.done():
+            sos_task.cancel()
+        if not timer_cancelled:
+            sos_task = asyncio.create_task(start_call_countdown(5, "AI safety protocol"))
+
+    async def confirm_safe():
+        pdf_file = await vault.generate_pdf_async(groq_service.memory)
+        if pdf_file and websocket_open:
+            await websocket.send_text(_dumps({"type": "download", "file": pdf_file}))
+            await websocket.send_text(_dumps({"type": "session_ended", "message": "Safe word confirmed. Session ended."}))
+
+    # -- Browser control messages: {"type": ...} -> handler(msg) --
+    def cancel_sos():
+        nonlocal timer_cancelled
+        timer_cancelled = True
+        if sos_task and not sos_task.done():
+            sos_task.cancel()
+
+    async def end_session(legacy: bool = False):
+        """Render the evidence PDF, text its link to contacts, and offer it for download."""
+        pdf_file = await vault.generate_pdf_async(groq_service.memory)
+        await relay.send_evidence_link(pdf_file)
+        if websocket_open:
+            await websocket.send_text(f"DOWNLOAD:{pdf_file}" if legacy else _dumps({"type": "download", "file": pdf_file}))
+
+    async def on_user_profile(msg):
+        UserProfile.set_name(msg.get("name", ""))
+        UserProfile.set_contacts(msg.get("contacts", []))
+        groq_service._init_system_prompt()
+
+    async def on_location(msg):
+        LocationStore.update(msg.get("coords", ""))
+
+    async def on_silent_mode(msg):
+        nonlocal silent_mode
+        silent_mode = msg.get("enabled", False)
+        calyx_state.silent_mode = silent_mode
+
+    async def on_text_message(msg):
+        text_content = msg.get("content", "").strip()
+        if text_content:
+            await reset_inactivity_timer()
+            if "cancel" in trigger_words(text_content):
+                cancel_sos()
+            text_queue.put_nowait(text_content)
+
+    async def on_cancel_timer(msg):
+        cancel_sos()
+
+    async def on_sos(msg):
+        await trigger_call("SOS button")
+
+    async def on_end_session(msg):
+        await end_session()
+
+    MESSAGE_HANDLERS = {
+        "user_profile": on_user_profile,
+        "location": on_location,
+        "silent_mode": on_silent_mode,
+        "text_message": on_text_message,
+        "cancel_timer": on_cancel_timer,
+        "sos": on_sos,
+        "end_session": on_end_session,
+    }
+    # Plain-text commands from older clients ("LOC:<coords>" is matched by prefix)
+    LEGACY_HANDLERS = {
+        "TRIGGER_SOS": lambda: trigger_call("SOS button"),
+        "END_SESSION": lambda: end_session(legacy=True),
+    }
+
     # -- Deepgram transcript callback --
     async def on_transcript(text):
         nonlocal sos_task
         await reset_inactivity_timer()
         if sos_task and not sos_task.done():
             sos_task.cancel()
-        if "safe" in text.lower() or "end session" in text.lower():
-            pdf_file = vault.generate_pdf(groq_service.memory)
-            await relay.send_evidence_link(pdf_file)
-            if websocket_open:
-                await websocket.send_text(json.dumps({"type": "download", "file": pdf_file}))
-        await transcript_queue.put(text)
+        words = trigger_words(text)
+        if "safe" in words or "end session" in words:
+            await end_session()
+        transcript_queue.put_nowait(text)
 
     try:
         dg_started = await dg_service.start(on_transcript, is_phone=False)
@@ -229,75 +408,46 @@ async def websocket_endpoint(websocket: WebSocket):
 
         # -- Task 1: Receive commands & audio from browser --
         async def receive_cmds():
-            nonlocal websocket_open, sos_task, silent_mode, timer_cancelled, inactivity_task, dg_started
+            nonlocal websocket_open, inactivity_task
             try:
                 inactivity_task = asyncio.create_task(start_inactivity_timer())
 
-                while websocket_open:
+                while True:
                     data = await websocket.receive()
-                    if "bytes" in data:
+                    if data["type"] == "websocket.disconnect":
+                        break
+                    # Audio frames dominate, so they take the first and shortest path
+                    audio = data.get("bytes")
+                    if audio is not None:
                         if not silent_mode and dg_started:
-                            await dg_service.send_audio(data["bytes"])
-                    if "text" in data:
-                        try:
-                            msg = json.loads(data["text"])
-                            msg_type = msg.get("type", "")
-
-                            if msg_type == "user_profile":
-                                UserProfile.set_name(msg.get("name", ""))
-                                UserProfile.set_contacts(msg.get("contacts", []))
-                                groq_service._init_system_prompt()
-
-                            elif msg_type == "location":
-                                LocationStore.update(msg.get("coords", ""))
-
-                            elif msg_type == "silent_mode":
-                                silent_mode = msg.get("enabled", False)
-                                calyx_state.silent_mode = silent_mode
-
-                            elif msg_type == "text_message":
-                                text_content = msg.get("content", "").strip()
-                                if text_content:
-                                    await reset_inactivity_timer()
-                                    if "cancel" in text_content.lower():
-                                        timer_cancelled = True
-                                        if sos_task and not sos_task.done():
-                                            sos_task.cancel()
-                                    await text_queue.put(text_content)
-
-                            elif msg_type == "cancel_timer":
-                                timer_cancelled = True
-                                if sos_task and not sos_task.done():
-                                    sos_task.cancel()
-
-                            elif msg_type == "sos":
-                                await trigger_call("SOS button")
-
-                            elif msg_type == "end_session":
-                                pdf_file = vault.generate_pdf(groq_service.memory)
-                                await relay.send_evidence_link(pdf_file)
-                                if websocket_open:
-                                    await websocket.send_text(json.dumps({"type": "download", "file": pdf_file}))
-
-                        except json.JSONDecodeError:
-                            # Legacy plain-text command handling
-                            cmd = data["text"]
-                            if cmd.startswith("LOC:"):
-                                LocationStore.update(cmd.split("LOC:")[1])
-                            elif cmd == "TRIGGER_SOS":
-                                await trigger_call("SOS button")
-                            elif cmd == "END_SESSION":
-                                pdf_file = vault.generate_pdf(groq_service.memory)
-                                await relay.send_evidence_link(pdf_file)
-                                if websocket_open:
-                                    await websocket.send_text(f"DOWNLOAD:{pdf_file}")
+                            await dg_service.send_audio(audio)
+                        continue
+                    text = data.get("text")
+                    if text is None:
+                        continue
+                    try:
+                        msg = orjson.loads(text)
+                    except orjson.JSONDecodeError:
+                        # Legacy plain-text command handling
+                        if text.startswith("LOC:"):
+                            LocationStore.update(text[4:])
+                        else:
+                            handler = LEGACY_HANDLERS.get(text)
+                            if handler:
+                                await handler()
+                        continue
+                    handler = MESSAGE_HANDLERS.get(msg.get("type", ""))
+                    if handler:
+                        await handler(msg)
 
             except (WebSocketDisconnect, RuntimeError):
                 pass
+            finally:
+                websocket_open = False
 
         # -- Task 2: Voice AI pipeline (STT -> LLM -> TTS) --
         async def process_voice_ai():
-            nonlocal sos_task, websocket_open, timer_cancelled
+            nonlocal timer_cancelled
             try:
                 while websocket_open:
                     user_text = await transcript_queue.get()
@@ -307,31 +457,25 @@ async def websocket_endpoint(websocket: WebSocket):
                     timer_cancelled = False
                     calyx_state.reset_interruption()
                     if websocket_open:
-                        await websocket.send_text(json.dumps({"type": "clear"}))
+                        await websocket.send_text(_dumps({"type": "clear"}))
 
-                    if "call" in user_text.lower() and ("contact" in user_text.lower() or "now" in user_text.lower() or "please" in user_text.lower()):
+                    if asks_for_call(trigger_words(user_text)):
                         await trigger_call("user requested")
 
                     text_stream = groq_service.get_streaming_response(user_text, is_text_mode=False)
                     audio_stream = tts_service.stream_audio(text_stream)
 
                     if calyx_state.mode_changed and websocket_open:
-                        await websocket.send_text(json.dumps({"type": "mode", "mode": calyx_state.mode}))
+                        await websocket.send_text(_dumps({"type": "mode", "mode": calyx_state.mode}))
                         calyx_state.mode_changed = False
 
                     async for chunk in audio_stream:
-                        if chunk == b"SIGNAL_CALL":
+                        if chunk == SIGNAL_CALL:
                             await trigger_call("AI requested call")
-                        elif chunk == b"SIGNAL_TIMER":
-                            if sos_task and not sos_task.done():
-                                sos_task.cancel()
-                            if not timer_cancelled:
-                                sos_task = asyncio.create_task(start_call_countdown(5, "AI safety protocol"))
-                        elif chunk == b"SIGNAL_SAFE":
-                            pdf_file = vault.generate_pdf(groq_service.memory)
-                            if pdf_file and websocket_open:
-                                await websocket.send_text(json.dumps({"type": "download", "file": pdf_file}))
-                                await websocket.send_text(json.dumps({"type": "session_ended", "message": "Safe word confirmed. Session ended."}))
+                        elif chunk == SIGNAL_TIMER:
+                            restart_countdown()
+                        elif chunk == SIGNAL_SAFE:
+                            await confirm_safe()
                         elif websocket_open and not calyx_state.interrupted:
                             await websocket.send_bytes(chunk)
             except (WebSocketDisconnect, RuntimeError):
@@ -339,17 +483,18 @@ async def websocket_endpoint(websocket: WebSocket):
 
         # -- Task 3: Text-only AI (silent/covert mode) --
         async def process_text_ai():
-            nonlocal sos_task, websocket_open, timer_cancelled
+            nonlocal timer_cancelled
             try:
                 while websocket_open:
                     user_text = await text_queue.get()
 
-                    if "cancel" not in user_text.lower():
+                    words = trigger_words(user_text)
+                    if "cancel" not in words:
                         timer_cancelled = False
 
                     calyx_state.reset_interruption()
 
-                    if "call" in user_text.lower() and ("contact" in user_text.lower() or "now" in user_text.lower() or "please" in user_text.lower()):
+                    if asks_for_call(words):
                         await trigger_call("user requested")
 
                     full_response = ""
@@ -358,11 +503,11 @@ async def websocket_endpoint(websocket: WebSocket):
                     try:
                         async for chunk in groq_service.get_streaming_response(user_text, is_text_mode=True):
                             if isinstance(chunk, bytes):
-                                if chunk == b"SIGNAL_CALL":
+                                if chunk == SIGNAL_CALL:
                                     signals_triggered.append("call")
-                                elif chunk == b"SIGNAL_TIMER":
+                                elif chunk == SIGNAL_TIMER:
                                     signals_triggered.append("timer")
-                                elif chunk == b"SIGNAL_SAFE":
+                                elif chunk == SIGNAL_SAFE:
                                     signals_triggered.append("safe")
                             else:
                                 full_response += chunk
@@ -372,7 +517,7 @@ async def websocket_endpoint(websocket: WebSocket):
 
                     if websocket_open and full_response.strip():
                         avg_latency = calyx_state.get_avg_latency()
-                        await websocket.send_text(json.dumps({
+                        await websocket.send_text(_dumps({
                             "type": "ai_text_response",
                             "content": full_response.strip(),
                             "latency": avg_latency
@@ -382,31 +527,27 @@ async def websocket_endpoint(websocket: WebSocket):
                         if signal == "call":
                             await trigger_call("AI requested call")
                         elif signal == "timer":
-                            if sos_task and not sos_task.done():
-                                sos_task.cancel()
-                            if not timer_cancelled:
-                                sos_task = asyncio.create_task(start_call_countdown(5, "AI safety protocol"))
+                            restart_countdown()
                         elif signal == "safe":
-                            pdf_file = vault.generate_pdf(groq_service.memory)
-                            if pdf_file and websocket_open:
-                                await websocket.send_text(json.dumps({"type": "download", "file": pdf_file}))
-                                await websocket.send_text(json.dumps({"type": "session_ended", "message": "Safe word confirmed. Session ended."}))
+                            await confirm_safe()
 
                     if calyx_state.mode_changed and websocket_open:
-                        await websocket.send_text(json.dumps({"type": "mode", "mode": calyx_state.mode}))
+                        await websocket.send_text(_dumps({"type": "mode", "mode": calyx_state.mode}))
                         calyx_state.mode_changed = False
 
             except (WebSocketDisconnect, RuntimeError):
                 pass
 
-        # Run all three tasks concurrently
+        # Run all three tasks concurrently. The AI loops idle on their queues,
+        # so the session ends as soon as any task does (normally receive_cmds
+        # on disconnect) and the rest are cancelled below.
         tasks = [
             asyncio.create_task(receive_cmds()),
             asyncio.create_task(process_voice_ai()),
             asyncio.create_task(process_text_ai())
         ]
         try:
-            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
             for task in done:
                 if task.exception():
                     print(f">>> [MAIN] Task exception: {task.exception()}")
@@ -414,20 +555,22 @@ async def websocket_endpoint(websocket: WebSocket):
             pass
         finally:
             for task in tasks:
-                if not task.done():
-                    task.cancel()
+                task.cancel()
+            # Let cancelled workers unwind (closing in-flight Murf/Groq
+            # streams) before the services below are stopped
+            await asyncio.gather(*tasks, return_exceptions=True)
     except asyncio.CancelledError:
         pass
     finally:
         websocket_open = False
+        close_session(session_id, sos_task, inactivity_task)
+        warm_task.cancel()
+        if inactivity_task:
+            inactivity_task.cancel()
         try:
             await dg_service.stop()
         except:
             pass
-        try:
-            await tts_service.close()
-        except:
-            pass
 
 
 # ---------------------------------------------------------------------------
@@ -440,88 +583,77 @@ async def twilio_endpoint(websocket: WebSocket):
     print("[Phone] Twilio WebSocket connected")
 
     phone_state = CalyxState()
-    phone_state.incident_context = calyx_state.incident_context
-    phone_state.conversation_context = calyx_state.conversation_context
     phone_state.is_phone_call = True
+    session_state = None
     dg_service = DeepgramService(phone_state)
     twilio_service = TwilioPhoneService(phone_state)
     groq_service = GroqService(phone_state)
-    first_responder = phone_state.conversation_context.first_responder or "there"
-    groq_service.set_phone_persona(first_responder)
     tts_service = MurfService(phone_state)
 
     async def on_phone_transcript(sentence):
         try:
-            buffer = ""
-            delims = [".", "?", "!"]
-
-            async for chunk in groq_service.get_streaming_response(sentence):
-                if isinstance(chunk, bytes):
-                    continue
-                buffer += chunk
-
-                if any(buffer.strip().endswith(d) for d in delims) and len(buffer) > 10:
-                    clean = buffer.strip()
-                    print(f"[Phone AI]: {clean}")
-                    async for pcm in tts_service.generate_phone_audio(clean):
-                        msg = twilio_service.create_outgoing_audio_msg(pcm)
-                        if msg:
-                            await websocket.send_json(msg)
-                    buffer = ""
-
-            if buffer.strip():
-                print(f"[Phone AI]: {buffer.strip()}")
-                async for pcm in tts_service.generate_phone_audio(buffer.strip()):
-                    msg = twilio_service.create_outgoing_audio_msg(pcm)
-                    if msg:
-                        await websocket.send_json(msg)
+            text_stream = groq_service.get_streaming_response(sentence)
+            async for pcm in tts_service.stream_phone_audio(text_stream):
+                msg = twilio_service.create_outgoing_audio_msg(pcm)
+                if msg:
+                    await websocket.send_text(msg)
         except Exception as e:
             print(f"[Phone] Transcript handler error: {e}")
 
-    dg_started = False
-    first_media_received = False
+    async def play_line(payloads, text):
+        """Send pre-encoded payloads if cached, else synthesize the text now."""
+        if payloads:
+            for payload in payloads:
+                await websocket.send_text(twilio_service.media_msg(payload))
+            return
+        async for chunk in tts_service.generate_phone_audio(text):
+            msg_out = twilio_service.create_outgoing_audio_msg(chunk)
+            if msg_out:
+                await websocket.send_text(msg_out)
+
+    dg_task = None
 
     try:
         while True:
             data = await websocket.receive_text()
-            msg = json.loads(data)
+            msg = orjson.loads(data)
             event = msg.get('event', '')
 
             if event == 'start':
                 twilio_service.stream_sid = msg['start']['streamSid']
                 print(f"[Phone] Stream started: {twilio_service.stream_sid}")
 
+                # The call's TwiML names the browser session that placed it. An
+                # unknown id gets no context rather than another user's.
+                session_id = msg['start'].get('customParameters', {}).get('session')
+                session_state = SESSIONS.get(session_id)
+                if session_state:
+                    phone_state.incident_context = session_state.incident_context
+                    phone_state.conversation_context = session_state.conversation_context
+                else:
+                    print(f"[Phone] No session for call ({(session_id or 'none')[:8]})")
+                first_responder = phone_state.conversation_context.first_responder or "there"
+                groq_service.set_phone_persona(first_responder)
+
+                # Open the Deepgram stream while the intro plays instead of on
+                # the first media frame, so the handshake is off the reply path
+                dg_task = asyncio.create_task(dg_service.start(on_phone_transcript, is_phone=True))
+
                 user_name = UserProfile.get_name()
                 situation = phone_state.conversation_context.situation_summary or "triggered an emergency alert"
 
                 try:
-                    if PHONE_INTRO_AUDIO:
-                        msg_out = twilio_service.create_outgoing_audio_msg(PHONE_INTRO_AUDIO)
-                        if msg_out:
-                            await websocket.send_json(msg_out)
-                    else:
-                        quick_intro = "Hello, this is Calyx. I'm calling about an emergency. Please hold on."
-                        async for chunk in tts_service.generate_phone_audio(quick_intro):
-                            msg_out = twilio_service.create_outgoing_audio_msg(chunk)
-                            if msg_out:
-                                await websocket.send_json(msg_out)
-
-                    details = f"{user_name} needs your help. They {situation[:100]}. I've sent you a text with their location. How can I help you help them?"
-                    async for chunk in tts_service.generate_phone_audio(details):
-                        msg_out = twilio_service.create_outgoing_audio_msg(chunk)
-                        if msg_out:
-                            await websocket.send_json(msg_out)
+                    await play_line(PHONE_INTRO_PAYLOADS, PHONE_INTRO_TEXT)
+                    await play_line(None, f"{user_name} needs your help. They {situation[:100]}.")
+                    await play_line(PHONE_CLOSING_PAYLOADS, PHONE_CLOSING_TEXT)
                 except Exception as e:
                     print(f"[Phone] Error playing intro: {e}")
 
             elif event == 'media':
                 try:
-                    if not first_media_received:
-                        first_media_received = True
-                        dg_started = await dg_service.start(on_phone_transcript, is_phone=True)
-
-                    chunk = await twilio_service.process_incoming_audio(msg['media']['payload'])
-                    if chunk and dg_started:
+                    # send_audio is a no-op until the stream opened at 'start' is ready
+                    chunk = twilio_service.incoming_mulaw(msg['media']['payload'])
+                    if chunk:
                         await dg_service.send_audio(chunk)
                 except Exception as e:
                     print(f"[Phone] Media processing error: {e}")
@@ -535,16 +667,31 @@ async def twilio_endpoint(websocket: WebSocket):
     except Exception as e:
         print(f"[Phone] Error: {e}")
     finally:
-        calyx_state.call_active = False
+        if session_state:
+            session_state.call_active = False
+            release_session(session_id)
+        if dg_task and not dg_task.done():
+            dg_task.cancel()
         try:
             await dg_service.stop()
         except:
             pass
-        try:
-            await tts_service.close()
-        except:
-            pass
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop (libuv) cuts per-await overhead on the streaming hot paths, and
+    # httptools is the C HTTP parser; both ship with uvicorn[standard] but
+    # uvloop is unavailable on Windows
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    try:
+        import httptools  # noqa: F401
+        http = "httptools"
+    except ImportError:
+        http = "h11"
+    # Single worker: the session registry, UserProfile and LocationStore live
+    # in this process. The access log is off; the app logs its own events.
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop, http=http, ws="websockets", access_log=False)
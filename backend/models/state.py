@@ -6,10 +6,14 @@ and the adaptive mode system that drives voice profile switching.
 """
 
 import datetime
+from collections import deque
 from typing import List, Dict, Optional
 
 from .voice_profiles import VOICE_PROFILES
 
+# Most recent turns kept in ConversationContext.messages
+_MAX_CONTEXT_MESSAGES = 50
+
 
 class UserProfile:
     """Stores user's name and emergency contacts for the active session."""
@@ -46,6 +50,7 @@ class LocationStore:
     _lat = None
     _lng = None
     _raw = "Unknown Location"
+    _map_link = "Location unavailable"
 
     @classmethod
     def update(cls, coords):
@@ -53,17 +58,24 @@ class LocationStore:
             return
         if not isinstance(coords, str):
             coords = str(coords)
-        clean = coords.strip()
-        if "," in clean:
-            parts = clean.split(",")
-            if len(parts) >= 2:
-                try:
-                    cls._lat = float(parts[0].strip())
-                    cls._lng = float(parts[1].strip())
-                    cls._raw = f"{cls._lat},{cls._lng}"
-                    print(f">>> [GPS] Updated: lat={cls._lat}, lng={cls._lng}")
-                except ValueError as e:
-                    print(f">>> [GPS] ValueError: {e}")
+        # partition instead of strip/split: float() already ignores whitespace
+        lat_str, sep, rest = coords.partition(",")
+        if not sep:
+            return
+        try:
+            lat = float(lat_str)
+            lng = float(rest.partition(",")[0])
+        except ValueError as e:
+            print(f">>> [GPS] ValueError: {e}")
+            return
+        # The browser repeats its last fix on every ping; skip unchanged ones
+        if lat == cls._lat and lng == cls._lng:
+            return
+        cls._lat = lat
+        cls._lng = lng
+        cls._raw = f"{lat},{lng}"
+        cls._map_link = f"https://maps.google.com/?q={cls._raw}"
+        print(f">>> [GPS] Updated: lat={lat}, lng={lng}")
 
     @classmethod
     def get(cls) -> str:
@@ -75,14 +87,18 @@ class LocationStore:
 
     @classmethod
     def get_map_link(cls) -> str:
-        if cls._lat is not None and cls._lng is not None:
-            return f"https://maps.google.com/?q={cls._lat},{cls._lng}"
-        return "Location unavailable"
+        return cls._map_link
 
 
 class ConversationContext:
     """Tracks conversation history, threat assessment, and incident details."""
 
+    __slots__ = (
+        "messages", "threat_level", "situation_summary", "detected_scenario",
+        "key_facts", "user_state", "safe_word_verified", "contacts_notified",
+        "first_responder",
+    )
+
     def __init__(self):
         self.messages: List[Dict] = []
         self.threat_level = 0
@@ -112,6 +128,10 @@ class ConversationContext:
             "content": content,
             "timestamp": datetime.datetime.now().isoformat()
         })
+        # Readers only look at the last few turns; trimming in batches keeps
+        # a long session bounded at amortized O(1) per message
+        if len(self.messages) > 2 * _MAX_CONTEXT_MESSAGES:
+            del self.messages[:-_MAX_CONTEXT_MESSAGES]
 
     def get_recent_context(self, n: int = 15) -> str:
         recent = self.messages[-n:] if len(self.messages) > n else self.messages
@@ -143,7 +163,7 @@ class ConversationContext:
 
         return " | ".join(parts) if parts else f"{user_name} triggered emergency SOS."
 
-    def generate_sms_briefing(self, lat: float = None, lng: float = None) -> str:
+    def generate_sms_briefing(self) -> str:
         user_name = UserProfile.get_name()
         lines = ["CALYX EMERGENCY ALERT"]
         lines.append(f"{user_name} needs your help!")
@@ -153,12 +173,10 @@ class ConversationContext:
         elif self.detected_scenario:
             lines.append(f"\nType: {self.detected_scenario.replace('_', ' ').title()}")
 
-        if lat is None or lng is None:
-            lat, lng = LocationStore.get_coords()
-
+        lat, lng = LocationStore.get_coords()
         if lat is not None and lng is not None:
             lines.append(f"\nLOCATION:")
-            lines.append(f"https://maps.google.com/maps?q={lat},{lng}")
+            lines.append(LocationStore.get_map_link())
         else:
             raw_loc = LocationStore.get()
             if raw_loc and raw_loc != "Unknown Location":
@@ -171,6 +189,14 @@ class ConversationContext:
 class CalyxState:
     """Central state object shared across all services in a session."""
 
+    # Read on every streamed token and audio chunk; slots keep those lookups
+    # off a per-instance dict
+    __slots__ = (
+        "mode", "voice_profile", "mode_changed", "interrupted", "is_phone_call",
+        "incident_context", "call_active", "silent_mode", "covert_screen_active",
+        "conversation_context", "decoy_persona", "latency_samples", "session_open",
+    )
+
     def __init__(self):
         self.mode = "DEFAULT"
         self.voice_profile = VOICE_PROFILES["DEFAULT"]
@@ -179,11 +205,15 @@ class CalyxState:
         self.is_phone_call = False
         self.incident_context = ""
         self.call_active = False
+        # False once the browser socket closes; a pending call may still need
+        # this state
+        self.session_open = True
         self.silent_mode = False
         self.covert_screen_active = False
         self.conversation_context = ConversationContext()
         self.decoy_persona = None
-        self.latency_samples = []
+        # Rolling window of the last 20 first-byte latencies
+        self.latency_samples = deque(maxlen=20)
 
     @property
     def voice_id(self):
@@ -209,8 +239,6 @@ class CalyxState:
 
     def add_latency_sample(self, ms: int):
         self.latency_samples.append(ms)
-        if len(self.latency_samples) > 20:
-            self.latency_samples = self.latency_samples[-20:]
 
     def get_avg_latency(self) -> int:
         if not self.latency_samples:
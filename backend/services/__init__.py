@@ -1,6 +1,7 @@
-from .deepgram_service import DeepgramService
-from .groq_service import GroqService
-from .murf_service import MurfService
+from .deepgram_service import DeepgramService, get_deepgram_client
+from .groq_service import GroqService, warm_up_groq, SIGNAL_CALL, SIGNAL_TIMER, SIGNAL_SAFE
+from .murf_service import MurfService, warm_up_murf
 from .twilio_service import TwilioPhoneService
 from .guardian_relay import GuardianRelay
 from .evidence_vault import EvidenceVault
+from .http_client import get_http_client, close_http_client
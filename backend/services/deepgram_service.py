@@ -2,39 +2,69 @@
 Deepgram Nova-2 Speech-to-Text service.
 
 Handles real-time audio transcription over WebSocket for both
-browser sessions (16kHz) and Twilio phone calls (8kHz mulaw).
+browser sessions (16kHz linear PCM) and Twilio phone calls (8kHz mulaw,
+passed through undecoded).
 """
 
 import os
-from deepgram import DeepgramClient, LiveOptions, LiveTranscriptionEvents
+import asyncio
+from deepgram import DeepgramClient, DeepgramClientOptions, LiveOptions, LiveTranscriptionEvents
 
 from models import CalyxState
 
+# Frames are coalesced into ~100 ms sends instead of one await per 20 ms frame
+_BATCH_SECONDS = 0.1
+_QUEUE_FRAMES = 200
+
+_dg_client = None
+
+
+def get_deepgram_client() -> DeepgramClient:
+    """Process-wide Deepgram client, shared by every session's connections."""
+    global _dg_client
+    if _dg_client is None:
+        # keepalive makes the SDK ping the socket so it survives silent stretches
+        _dg_client = DeepgramClient(
+            os.getenv("DEEPGRAM_API_KEY"),
+            DeepgramClientOptions(options={"keepalive": "true"}),
+        )
+    return _dg_client
+
 
 class DeepgramService:
     def __init__(self, state: CalyxState):
-        self.api_key = os.getenv("DEEPGRAM_API_KEY")
         self.state = state
-        self.client = DeepgramClient(self.api_key)
+        self.client = get_deepgram_client()
         self.connection = None
         self.is_connected = False
+        self._q = asyncio.Queue(maxsize=_QUEUE_FRAMES)
+        self._sender_task = None
+        # Frames taken off the queue but not yet sent, so stop() can flush them
+        self._batch = []
+        self._batch_bytes = 0
 
     async def start(self, callback, is_phone=False):
         try:
             mode = 'phone' if is_phone else 'user'
             print(f"[DEEPGRAM] Connecting ({mode})...")
 
-            self.client = DeepgramClient(self.api_key)
             self.connection = self.client.listen.asyncwebsocket.v("1")
 
             async def on_msg(sender, result, **kwargs):
+                # Check finality before touching the transcript
+                if not result.is_final:
+                    return
                 try:
                     text = result.channel.alternatives[0].transcript
-                    if text and result.is_final:
-                        print(f"[{'Phone' if is_phone else 'User'}]: {text}")
-                        if not is_phone:
-                            self.state.signal_interruption()
-                        await callback(text)
+                except (IndexError, AttributeError):
+                    return
+                if not text:
+                    return
+                try:
+                    print(f"[{'Phone' if is_phone else 'User'}]: {text}")
+                    if not is_phone:
+                        self.state.signal_interruption()
+                    await callback(text)
                 except Exception as e:
                     print(f"[DEEPGRAM] Transcript error: {e}")
 
@@ -43,7 +73,8 @@ class DeepgramService:
             opts = LiveOptions(
                 model="nova-2-phonecall" if is_phone else "nova-2",
                 language="en-US",
-                encoding="linear16",
+                # Phone audio is forwarded as Twilio's raw mulaw, skipping a decode per frame
+                encoding="mulaw" if is_phone else "linear16",
                 sample_rate=8000 if is_phone else 16000,
                 channels=1,
                 interim_results=False,
@@ -52,6 +83,9 @@ class DeepgramService:
 
             self.is_connected = await self.connection.start(opts)
             if self.is_connected:
+                # 100 ms of mulaw at 8 kHz, or of 16-bit PCM at 16 kHz
+                self._batch_bytes = int((8000 if is_phone else 32000) * _BATCH_SECONDS)
+                self._sender_task = asyncio.create_task(self._drain())
                 print(f"[DEEPGRAM] Ready ({mode})")
                 return True
 
@@ -61,14 +95,61 @@ class DeepgramService:
         return False
 
     async def send_audio(self, data: bytes):
-        if self.connection and self.is_connected:
+        if not (self.connection and self.is_connected):
+            return
+        if self._q.full():
+            # Drop the oldest frame rather than stall the media socket
             try:
-                await self.connection.send(data)
-            except:
+                self._q.get_nowait()
+            except asyncio.QueueEmpty:
                 pass
+        self._q.put_nowait(data)
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        batch = self._batch
+        while True:
+            batch.append(await self._q.get())
+            size = len(batch[0])
+            deadline = loop.time() + _BATCH_SECONDS
+            while size < self._batch_bytes:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    frame = await asyncio.wait_for(self._q.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(frame)
+                size += len(frame)
+
+            try:
+                await self.connection.send(batch[0] if len(batch) == 1 else b"".join(batch))
+            except Exception as e:
+                print(f"[DEEPGRAM] Send error: {e}")
+            # Cleared only once the send is over: if stop() cancels it mid-send,
+            # the batch is still there to flush
+            batch.clear()
 
     async def stop(self):
         self.is_connected = False
+        if self._sender_task:
+            self._sender_task.cancel()
+            try:
+                await self._sender_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._sender_task = None
+        # The last buffered audio is usually the user's final words; send it
+        # in one frame before closing instead of dropping it
+        while not self._q.empty():
+            self._batch.append(self._q.get_nowait())
+        if self._batch and self.connection:
+            try:
+                await self.connection.send(b"".join(self._batch))
+            except Exception as e:
+                print(f"[DEEPGRAM] Send error: {e}")
+        self._batch.clear()
         if self.connection:
             try:
                 await self.connection.finish()
@@ -7,60 +7,108 @@ GPS coordinates, and metadata for post-incident documentation.
 
 import os
 import re
-import datetime
+import time
+import asyncio
 
 from fpdf import FPDF
 
 from models import UserProfile, LocationStore
 
+_TAG_STRIP_RE = re.compile(r"\[(?:MODE|SIGNAL|TEXT|CONTACT)[^\]]*\]")
+# Core PDF fonts are latin-1 only; anything outside it prints as "?"
+_NON_LATIN1_RE = re.compile(r"[^\x00-\xff]")
+
+# A Unicode TTF keeps names and transcripts in any script. Without one the
+# report falls back to the latin-1 core font.
+_UNICODE_FONT_PATHS = (
+    os.getenv("CALYX_PDF_FONT", ""),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+)
+_UNICODE_FONT = next((p for p in _UNICODE_FONT_PATHS if p and os.path.exists(p)), None)
+_UNICODE_FONT_BOLD = None
+if _UNICODE_FONT:
+    for candidate in (_UNICODE_FONT.replace(".ttf", "-Bold.ttf"), _UNICODE_FONT.replace(".ttf", "bd.ttf")):
+        if os.path.exists(candidate):
+            _UNICODE_FONT_BOLD = candidate
+            break
+
 
 class EvidenceVault:
     def __init__(self):
-        self.base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        self.static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "static")
-        self.static_dir = os.path.normpath(self.static_dir)
+        here = os.path.dirname(os.path.abspath(__file__))
+        self.base_dir = os.path.dirname(here)
+        self.static_dir = os.path.normpath(os.path.join(here, "..", "static"))
         os.makedirs(self.static_dir, exist_ok=True)
 
+    async def generate_pdf_async(self, memory, user_name: str = None):
+        """Run generate_pdf in a worker thread so layout and disk I/O don't block the event loop."""
+        return await asyncio.to_thread(self.generate_pdf, memory, user_name)
+
     def generate_pdf(self, memory, user_name: str = None):
         try:
             user_name = user_name or UserProfile.get_name()
+            # One timestamp for both the header and the file name
+            now = time.localtime()
 
             pdf = FPDF()
+            if _UNICODE_FONT:
+                font = "CalyxSans"
+                pdf.add_font(font, "", _UNICODE_FONT)
+                pdf.add_font(font, "B", _UNICODE_FONT_BOLD or _UNICODE_FONT)
+            else:
+                font = "Helvetica"
+
+            def text(value: str) -> str:
+                if _UNICODE_FONT or value.isascii():
+                    return value
+                return _NON_LATIN1_RE.sub("?", value)
+
             pdf.add_page()
-            pdf.set_font("Arial", "B", 16)
-            pdf.cell(200, 10, "CALYX INCIDENT REPORT", ln=1, align='C')
-            pdf.set_font("Arial", "", 11)
-            pdf.cell(200, 7, f"User: {user_name}", ln=1, align='C')
-            pdf.cell(200, 7, f"Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=1, align='C')
+            pdf.set_font(font, "B", 16)
+            pdf.cell(200, 10, "CALYX INCIDENT REPORT", new_x="LMARGIN", new_y="NEXT", align='C')
+            pdf.set_font(font, "", 11)
+            pdf.cell(200, 7, text(f"User: {user_name}"), new_x="LMARGIN", new_y="NEXT", align='C')
+            pdf.cell(200, 7, time.strftime("Date: %Y-%m-%d %H:%M:%S", now), new_x="LMARGIN", new_y="NEXT", align='C')
 
             lat, lng = LocationStore.get_coords()
             if lat is not None and lng is not None:
-                pdf.cell(200, 7, f"Location: {lat}, {lng}", ln=1, align='C')
-                pdf.cell(200, 7, f"Map: https://maps.google.com/maps?q={lat},{lng}", ln=1, align='C')
+                pdf.cell(200, 7, f"Location: {lat}, {lng}", new_x="LMARGIN", new_y="NEXT", align='C')
+                pdf.cell(200, 7, f"Map: {LocationStore.get_map_link()}", new_x="LMARGIN", new_y="NEXT", align='C')
             pdf.ln(8)
 
-            pdf.set_font("Arial", "B", 12)
-            pdf.cell(200, 8, "TRANSCRIPT", ln=1)
-            pdf.set_font("Arial", "", 10)
+            pdf.set_font(font, "B", 12)
+            pdf.cell(200, 8, "TRANSCRIPT", new_x="LMARGIN", new_y="NEXT")
+            pdf.set_font(font, "", 10)
 
+            # Consecutive messages from the same speaker share one colour and
+            # are laid out with a single multi_cell
+            user_prefix = f"{user_name}: "
+            runs = []
             for msg in memory or []:
                 role = msg.get('role', '').upper()
                 if role == "SYSTEM":
                     continue
 
                 content = msg.get('content', '')
-                content = re.sub(r"\[(?:MODE|SIGNAL|TEXT|CONTACT)[^\]]*\]", "", content).strip()
+                content = _TAG_STRIP_RE.sub("", content).strip()
                 if not content:
                     continue
 
-                content = content.encode('latin-1', 'replace').decode('latin-1')
+                is_calyx = role == "ASSISTANT"
+                line = ("CALYX: " if is_calyx else user_prefix) + content
+                if runs and runs[-1][0] == is_calyx:
+                    runs[-1][1].append(line)
+                else:
+                    runs.append((is_calyx, [line]))
 
-                pdf.set_text_color(0, 100, 0) if role == "ASSISTANT" else pdf.set_text_color(0, 0, 0)
-                prefix = "CALYX: " if role == "ASSISTANT" else f"{user_name}: "
-                pdf.multi_cell(0, 5, f"{prefix}{content}")
+            for is_calyx, lines in runs:
+                pdf.set_text_color(*((0, 100, 0) if is_calyx else (0, 0, 0)))
+                pdf.multi_cell(0, 5, text("\n".join(lines)), new_x="LMARGIN", new_y="NEXT")
                 pdf.ln(2)
 
-            filename = f"evidence_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+            filename = time.strftime("evidence_%Y%m%d_%H%M%S.pdf", now)
             filepath = os.path.join(self.static_dir, filename)
             pdf.output(filepath)
             print(f">>> [VAULT] Generated: {filepath}")
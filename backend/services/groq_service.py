@@ -9,29 +9,122 @@ signals ([MODE:X], [SIGNAL:CALL/TIMER]) that drive the voice pipeline.
 import os
 import re
 import time
+import collections
 from typing import AsyncGenerator
 
-from groq import AsyncGroq
+import orjson
 
 from models import CalyxState, UserProfile, LocationStore
 from models.voice_profiles import SAFE_WORD
-
-
-class GroqService:
-    def __init__(self, state: CalyxState):
-        self.api_key = os.getenv("GROQ_API_KEY")
-        self.client = AsyncGroq(api_key=self.api_key)
-        self.state = state
-        self.memory = []
-        self._init_system_prompt()
-
-    def _init_system_prompt(self):
-        user_name = UserProfile.get_name()
-
-        self.system_prompt = f"""You are CALYX - an AI safety companion. The user's name is {user_name}.
+from .http_client import get_http_client
+from .response_cache import ResponseCache, normalize_utterance
+
+GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_MODEL = "llama-3.1-8b-instant"
+
+# Out-of-band signals yielded as bytes between text chunks
+SIGNAL_CALL = b"SIGNAL_CALL"
+SIGNAL_TIMER = b"SIGNAL_TIMER"
+SIGNAL_SAFE = b"SIGNAL_SAFE"
+
+_CONTROL_TAG_RE = re.compile(r"\[(?:MODE|SIGNAL):[^\]]+\]")
+
+# Text is yielded in batches of at least this many chars, or at sentence ends
+_YIELD_MIN_CHARS = 32
+_SENTENCE_END = frozenset(".?!")
+# Control tags are short; an open "[" that runs past this is plain text
+_MAX_TAG_CHARS = 32
+
+# Scenario keywords, in priority order. Compiled into one case-insensitive
+# alternation with a group per scenario, so each transcript is scanned once
+# instead of once per keyword.
+_SCENARIOS = (
+    (("intruder", "break in", "someone in my house", "breaking in"), "HOME_INTRUSION", 8, "reported a possible intruder in their home"),
+    (("following", "stalking", "behind me", "someone following"), "STALKING", 7, "is being followed by someone"),
+    (("hit me", "abusive", "hurts me", "violent"), "DOMESTIC_VIOLENCE", 8, "reported domestic violence"),
+    (("bleeding", "choking", "seizure", "heart attack"), "MEDICAL_EMERGENCY", 9, "is having a medical emergency"),
+    (("panic", "anxiety attack", "can't breathe", "panicking"), "PANIC_ATTACK", 5, "is having a panic attack"),
+    (("car broke", "stranded", "flat tire", "stuck"), "STRANDED", 4, "is stranded and needs help"),
+    (("drink", "drugged", "spiked", "dizzy"), "DRINK_SPIKING", 8, "may have been drugged"),
+    (("harassing", "threatening", "aggressive", "won't leave"), "HARASSMENT", 6, "is being harassed"),
+    (("scared", "afraid", "help", "danger"), "GENERAL_DANGER", 5, "feels unsafe and scared"),
+)
+_SCENARIO_RE = re.compile(
+    "|".join(f"({'|'.join(map(re.escape, keywords))})" for keywords, *_ in _SCENARIOS),
+    re.IGNORECASE,
+)
+_WEAPON_RE = re.compile(r"gun|knife|weapon", re.IGNORECASE)
+_INJURY_RE = re.compile(r"hurt|bleeding|injured", re.IGNORECASE)
+_IM_FINE_RE = re.compile(r"i'm fine", re.IGNORECASE)
+_COVERT_RE = re.compile(r"pizza|order|delivery|pepperoni|cheese", re.IGNORECASE)
+_SAFE_WORD_RE = re.compile(re.escape(SAFE_WORD), re.IGNORECASE)
+
+# History is trimmed by whole user/assistant pairs once it exceeds either
+# limit; tokens are estimated as chars / 4
+_MAX_TURNS = 29
+_HISTORY_TOKEN_BUDGET = 1500
+# Per-message cap on the transcript excerpt in the phone incident report
+_PHONE_CONTEXT_CHARS = 200
+
+
+_response_cache = ResponseCache(maxsize=256, ttl=600.0)
+
+
+async def _replay(parts):
+    for part in parts:
+        yield part
+
+
+def _set_decoy_mode(state: CalyxState, persona: str):
+    state.set_mode("DECOY", persona or "friend")
+
+
+def _set_covert_mode(state: CalyxState, persona: str):
+    state.set_mode("COVERT")
+    state.conversation_context.key_facts["code_used"] = "covert"
+
+
+# [MODE:X] tag -> handler(state, persona). Unknown modes are ignored.
+_MODE_HANDLERS = {
+    "STEALTH": lambda state, persona: state.set_mode("STEALTH"),
+    "CALM": lambda state, persona: state.set_mode("CALM"),
+    "MEDICAL": lambda state, persona: state.set_mode("MEDICAL"),
+    "URGENT": lambda state, persona: state.set_mode("URGENT"),
+    "DEFAULT": lambda state, persona: state.set_mode("DEFAULT"),
+    "DECOY": _set_decoy_mode,
+    "COVERT": _set_covert_mode,
+}
+
+
+def _apply_tag(state: CalyxState, tag: str):
+    """Act on the inside of a "[...]" tag.
+
+    Returns the signal to yield (b"" if none), or None if it isn't a control tag.
+    """
+    kind, _, rest = tag.partition(":")
+    if kind == "MODE" and rest:
+        mode, _, persona = rest.partition(":")
+        handler = _MODE_HANDLERS.get(mode)
+        if handler:
+            handler(state, persona)
+        return b""
+    if kind == "SIGNAL" and rest:
+        if rest == "CALL":
+            state.conversation_context.key_facts["time_critical"] = True
+            return SIGNAL_CALL
+        if rest == "TIMER":
+            return SIGNAL_TIMER
+        return b""
+    return None
+
+
+# Static instruction prompts. Per-session details (names, incident report) go
+# in a separate context message so the long prefix stays identical across
+# sessions and can be served from the provider's prompt cache.
+_MAIN_SYSTEM_PROMPT = f"""You are CALYX - an AI safety companion.
 
 ## SAFE WORD: "{SAFE_WORD}"
-- If {user_name} says they're safe WITHOUT saying "{SAFE_WORD}", they may be coerced
+- If the user says they're safe WITHOUT saying "{SAFE_WORD}", they may be coerced
 - Say: "Good to hear. Just confirm our word and I'll end the session."
 - Only end when you hear "{SAFE_WORD}"
 
@@ -129,7 +222,86 @@ If user mentions "pizza", "order", "delivery", "pepperoni" or gives strange/out-
 - NEVER mention or ask for the safe word - user will say it when ready
 - After emergency contacts are called, keep the conversation going naturally - don't break character
 """
-        self.memory = [{"role": "system", "content": self.system_prompt}]
+
+_PHONE_SYSTEM_PROMPT = """You are CALYX emergency AI on a phone call.
+
+CRITICAL: You are talking to the EMERGENCY CONTACT, not the user. They answered your call for help.
+The incident report that follows describes what happened, the situation, and the user's location.
+
+## HOW TO BE HELPFUL
+You're here to help the contact understand and respond to the emergency. Be warm, calm, and supportive.
+
+1. **If they ask what happened**: Explain the situation based on the incident report
+2. **If they ask about location**: If the GPS coordinates are available, say it's been sent to them via SMS, or say "I don't have their location, please try calling them directly"
+3. **If they ask what to do**: Suggest practical next steps:
+   - "Try calling them directly"
+   - "Check the SMS I sent - it has details"
+   - "If you can't reach them, consider going to their location"
+   - "If it seems serious, you might want to call local authorities"
+4. **If they say the user isn't answering**: "That's concerning. Keep trying, or consider going to check on them if you're nearby."
+5. **If they're worried or panicking**: Be reassuring - "I understand you're worried. Let's figure this out together."
+6. **If they confirm the user is safe**: Ask "Can you confirm the safe word to end the alert?"
+
+## YOUR CAPABILITIES (BE HONEST)
+- You ALREADY sent their location via SMS (if available)
+- You CANNOT track anyone or get new information - only share what you know
+- You're an AI assistant, not a 911 dispatcher
+
+## RULES
+- Be conversational and helpful, not robotic
+- If you don't have specific information, say so honestly but still try to help
+- Keep responses concise but warm (under 20 words)
+- only say up to 2 sentences at a time
+- Guide them on what actions they can take
+- NEVER say "I don't have that information" and stop - always follow up with a helpful suggestion"""
+
+
+def _groq_headers() -> dict:
+    return {"Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}", "Content-Type": "application/json"}
+
+
+async def warm_up_groq():
+    """Open a pooled connection to Groq with a 1-token completion."""
+    r = await get_http_client().post(
+        GROQ_URL,
+        content=orjson.dumps({"model": GROQ_MODEL, "messages": [{"role": "user", "content": "hi"}], "max_tokens": 1}),
+        headers=_groq_headers(),
+    )
+    r.raise_for_status()
+
+
+class GroqService:
+    def __init__(self, state: CalyxState):
+        self.api_key = os.getenv("GROQ_API_KEY")
+        self.http = get_http_client()
+        self._headers = _groq_headers()
+        self.state = state
+        self.turns = collections.deque()
+        self._turn_tokens = 0
+        self._init_system_prompt()
+
+    @property
+    def memory(self) -> list:
+        """Static prompt, session context, then the retained conversation turns."""
+        return [self.system_msg, self.context_msg, *self.turns]
+
+    def _append_turn(self, role: str, content: str):
+        self.turns.append({"role": role, "content": content})
+        self._turn_tokens += len(content) // 4
+        while len(self.turns) > 2 and (len(self.turns) > _MAX_TURNS or self._turn_tokens > _HISTORY_TOKEN_BUDGET):
+            for _ in range(2):
+                self._turn_tokens -= len(self.turns.popleft()["content"]) // 4
+
+    def _clear_turns(self):
+        self.turns.clear()
+        self._turn_tokens = 0
+
+    def _init_system_prompt(self):
+        user_name = UserProfile.get_name()
+
+        self.system_msg = {"role": "system", "content": _MAIN_SYSTEM_PROMPT}
+        self.context_msg = {"role": "system", "content": f"The user's name is {user_name}."}
+        self._clear_turns()
 
     def set_phone_persona(self, contact_name: str = "there"):
         """Configure for emergency contact phone call."""
@@ -139,21 +311,23 @@ If user mentions "pizza", "order", "delivery", "pepperoni" or gives strange/out-
 
         context_lines = []
         for msg in ctx.messages[-10:]:
+            if msg["role"] not in ("user", "assistant"):
+                continue
             role = "USER" if msg["role"] == "user" else "CALYX"
-            context_lines.append(f"{role}: {msg['content']}")
+            context_lines.append(f"{role}: {msg['content'][:_PHONE_CONTEXT_CHARS]}")
         context = "\n".join(context_lines) if context_lines else "No prior conversation recorded."
 
         situation = ctx.situation_summary or "User triggered emergency alert."
 
         lat, lng = LocationStore.get_coords()
         if lat is not None and lng is not None:
-            location_info = f"GPS coordinates: {lat}, {lng}\nMap: https://maps.google.com/?q={lat},{lng}"
+            location_info = f"GPS coordinates: {lat}, {lng}\nMap: {LocationStore.get_map_link()}"
         else:
             location_info = "Location not available"
 
         is_covert = self.state.mode == "COVERT" or self.state.conversation_context.key_facts.get("code_used") == "covert"
         covert_explanation = ""
-        if is_covert or any(word in context.lower() for word in ["pizza", "order", "delivery", "pepperoni", "cheese"]):
+        if is_covert or _COVERT_RE.search(context):
             covert_explanation = f"""
 ## IMPORTANT: COVERT DISTRESS SIGNAL DETECTED
 {user_name} used a COVERT CODE - they mentioned "pizza" or gave unusual responses because they CANNOT speak freely.
@@ -164,9 +338,10 @@ This is a DISTRESS SIGNAL, not an actual pizza order! Someone dangerous may be w
 - If extra cheese or toppings are mentioned, it indicates higher urgency
 """
 
-        self.memory = [{"role": "system", "content": f"""You are CALYX emergency AI speaking to {contact_name} on the phone.
-
-CRITICAL: You are talking to the EMERGENCY CONTACT, not {user_name}. {contact_name} answered your call for help.
+        self._clear_turns()
+        self.system_msg = {"role": "system", "content": _PHONE_SYSTEM_PROMPT}
+        self.context_msg = {"role": "system", "content": f"""## INCIDENT REPORT
+You are speaking to {contact_name}. The user is {user_name}.
 {covert_explanation}
 ## WHAT HAPPENED
 {user_name} used the Calyx safety app to request help. Here's what they said:
@@ -176,45 +351,15 @@ CRITICAL: You are talking to the EMERGENCY CONTACT, not {user_name}. {contact_na
 {situation}
 
 ## {user_name.upper()}'S LOCATION
-{location_info}
-
-## HOW TO BE HELPFUL
-You're here to help {contact_name} understand and respond to the emergency. Be warm, calm, and supportive.
-
-1. **If they ask what happened**: Explain the situation based on the conversation above
-2. **If they ask about location**: If the GPS coordinates are available, say it's been sent to them via SMS, or say "I don't have their location, please try calling {user_name} directly"
-3. **If they ask what to do**: Suggest practical next steps:
-   - "Try calling {user_name} directly"
-   - "Check the SMS I sent - it has details"
-   - "If you can't reach them, consider going to their location"
-   - "If it seems serious, you might want to call local authorities"
-4. **If they say {user_name} isn't answering**: "That's concerning. Keep trying, or consider going to check on them if you're nearby."
-5. **If they're worried or panicking**: Be reassuring - "I understand you're worried. Let's figure this out together."
-6. **If they confirm {user_name} is safe**: Ask "Can you confirm the safe word to end the alert?"
-
-## YOUR CAPABILITIES (BE HONEST)
-- You ALREADY sent their location via SMS (if available)
-- You CANNOT track anyone or get new information - only share what you know
-- You're an AI assistant, not a 911 dispatcher
-
-## RULES
-- Be conversational and helpful, not robotic
-- If you don't have specific information, say so honestly but still try to help
-- Keep responses concise but warm (under 20 words)
-- only say up to 2 sentences at a time
-- Guide them on what actions they can take
-- NEVER say "I don't have that information" and stop - always follow up with a helpful suggestion"""}]
+{location_info}"""}
 
     async def get_streaming_response(self, user_input: str, is_text_mode: bool = False) -> AsyncGenerator[str, None]:
         t0 = time.time()
         try:
-            if not self.memory:
-                self._init_system_prompt()
-
-            if SAFE_WORD.lower() in user_input.lower():
+            if _SAFE_WORD_RE.search(user_input):
                 self.state.conversation_context.safe_word_verified = True
                 print(f">>> [SAFE] Safe word verified!")
-                yield b"SIGNAL_SAFE"
+                yield SIGNAL_SAFE
 
             if self.state.is_phone_call:
                 formatted = f"[CONTACT]: {user_input}"
@@ -223,73 +368,87 @@ You're here to help {contact_name} understand and respond to the emergency. Be w
                 formatted = f"{prefix}{user_input}"
                 self.state.conversation_context.add_message("user", user_input)
 
-            self.memory.append({"role": "user", "content": formatted})
-
-            if len(self.memory) > 30:
-                self.memory = [self.memory[0]] + self.memory[-29:]
-
-            completion = await self.client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=self.memory,
-                stream=True,
-                temperature=0.35,
-                max_tokens=150,
-            )
-
-            buffer = ""
-            full_response = ""
-            first_token = True
-
-            async for chunk in completion:
-                content = chunk.choices[0].delta.content
-                if content:
-                    if first_token:
-                        latency = int((time.time() - t0) * 1000)
-                        self.state.add_latency_sample(latency)
-                        print(f"[GROQ] First token: {latency}ms")
-                        first_token = False
-
-                    buffer += content
-                    full_response += content
-
-                    if "]" in buffer:
-                        modes = re.findall(r"\[MODE:([A-Z]+)(?::(\w+))?\]", buffer)
-                        for m in modes:
-                            mode, persona = m[0], m[1] or None
-                            if mode == "STEALTH":
-                                self.state.set_mode("STEALTH")
-                            elif mode == "DECOY":
-                                self.state.set_mode("DECOY", persona or "friend")
-                            elif mode == "COVERT":
-                                self.state.set_mode("COVERT")
-                                self.state.conversation_context.key_facts["code_used"] = "covert"
-                            elif mode == "CALM":
-                                self.state.set_mode("CALM")
-                            elif mode == "MEDICAL":
-                                self.state.set_mode("MEDICAL")
-                            elif mode == "URGENT":
-                                self.state.set_mode("URGENT")
-                            elif mode == "DEFAULT":
-                                self.state.set_mode("DEFAULT")
-
-                        if "[SIGNAL:CALL]" in buffer:
-                            yield b"SIGNAL_CALL"
-                            self.state.conversation_context.key_facts["time_critical"] = True
-                        if "[SIGNAL:TIMER]" in buffer:
-                            yield b"SIGNAL_TIMER"
-
-                        buffer = re.sub(r"\[MODE:[A-Z]+(?::\w+)?\]", "", buffer)
-                        buffer = re.sub(r"\[SIGNAL:[A-Z]+\]", "", buffer)
-
-                    if buffer and "[" not in buffer:
-                        yield buffer
-                        buffer = ""
-
-            if buffer:
-                yield buffer
-
-            clean = re.sub(r"\[(?:MODE|SIGNAL):[^\]]+\]", "", full_response).strip()
-            self.memory.append({"role": "assistant", "content": full_response})
+            # Only a session's opening reply is cacheable: later replies depend
+            # on the conversation so far
+            cache_key = None
+            if not self.state.is_phone_call and not self.turns:
+                cache_key = (self.state.mode, self.context_msg["content"], normalize_utterance(formatted))
+            cached = _response_cache.get(cache_key) if cache_key else None
+            if cached:
+                print(f"[GROQ] Cache hit ({_response_cache.hit_rate:.0%} of openers)")
+
+            self._append_turn("user", formatted)
+
+            text = ""  # plain text not yet yielded
+            tag = None  # inside of an open "[...]", None outside one
+            response_parts = []
+            sent_signals = set()  # each signal fires at most once per reply
+            # A replayed opener starts instantly; timing it would skew the
+            # reported latency average
+            first_token = not cached
+
+            tokens = _replay(cached) if cached else self._stream_completion()
+            async for content in tokens:
+                if first_token:
+                    latency = int((time.time() - t0) * 1000)
+                    self.state.add_latency_sample(latency)
+                    print(f"[GROQ] First token: {latency}ms")
+                    first_token = False
+
+                response_parts.append(content)
+
+                # One pass over the new chunk only: text outside brackets is
+                # collected, a bracketed tag is acted on once it closes
+                signals = []
+                pos, end = 0, len(content)
+                while pos < end:
+                    if tag is None:
+                        start = content.find("[", pos)
+                        if start < 0:
+                            text += content[pos:]
+                            break
+                        text += content[pos:start]
+                        tag = ""
+                        pos = start + 1
+                    else:
+                        close = content.find("]", pos)
+                        if close < 0:
+                            tag += content[pos:]
+                            if len(tag) > _MAX_TAG_CHARS:
+                                text += "[" + tag
+                                tag = None
+                            break
+                        tag += content[pos:close]
+                        pos = close + 1
+                        stray, opened, tag = tag.rpartition("[")
+                        if opened:
+                            text += "[" + stray
+                        signal = _apply_tag(self.state, tag)
+                        if signal is None:
+                            text += f"[{tag}]"
+                        elif signal and signal not in sent_signals:
+                            sent_signals.add(signal)
+                            signals.append(signal)
+                        tag = None
+
+                for signal in signals:
+                    yield signal
+
+                if text and (len(text) >= _YIELD_MIN_CHARS or text.rstrip()[-1:] in _SENTENCE_END):
+                    yield text
+                    text = ""
+
+            if tag is not None:
+                text += "[" + tag
+            if text:
+                yield text
+
+            if cache_key and not cached and response_parts:
+                _response_cache.put(cache_key, tuple(response_parts))
+
+            full_response = "".join(response_parts)
+            clean = _CONTROL_TAG_RE.sub("", full_response).strip()
+            self._append_turn("assistant", full_response)
 
             if not self.state.is_phone_call:
                 self.state.conversation_context.add_message("assistant", clean)
@@ -302,42 +461,55 @@ You're here to help {contact_name} understand and respond to the emergency. Be w
             print(f"[GROQ] Error: {e}")
             yield "I'm here. Tell me what's happening."
 
+    async def _stream_completion(self) -> AsyncGenerator[str, None]:
+        """Yield content deltas from a streamed Groq chat completion."""
+        # Raw chat-completions SSE call: skips the SDK's per-message model
+        # validation, and shares the pooled HTTP/2 client with Murf
+        payload = orjson.dumps({
+            "model": GROQ_MODEL,
+            "messages": self.memory,
+            "stream": True,
+            "temperature": 0.35,
+            "max_tokens": 150,
+        })
+        async with self.http.stream("POST", GROQ_URL, content=payload, headers=self._headers) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                data = line[6:]
+                if data == "[DONE]":
+                    break
+                content = orjson.loads(data)["choices"][0]["delta"].get("content")
+                if content:
+                    yield content
+
     async def _analyze_context(self, text: str):
         """Keyword-based scenario detection to update threat level and summary."""
-        text_lower = text.lower()
         ctx = self.state.conversation_context
 
-        scenarios = [
-            (["intruder", "break in", "someone in my house", "breaking in"], "HOME_INTRUSION", 8, "reported a possible intruder in their home"),
-            (["following", "stalking", "behind me", "someone following"], "STALKING", 7, "is being followed by someone"),
-            (["hit me", "abusive", "hurts me", "violent"], "DOMESTIC_VIOLENCE", 8, "reported domestic violence"),
-            (["bleeding", "choking", "seizure", "heart attack"], "MEDICAL_EMERGENCY", 9, "is having a medical emergency"),
-            (["panic", "anxiety attack", "can't breathe", "panicking"], "PANIC_ATTACK", 5, "is having a panic attack"),
-            (["car broke", "stranded", "flat tire", "stuck"], "STRANDED", 4, "is stranded and needs help"),
-            (["drink", "drugged", "spiked", "dizzy"], "DRINK_SPIKING", 8, "may have been drugged"),
-            (["harassing", "threatening", "aggressive", "won't leave"], "HARASSMENT", 6, "is being harassed"),
-            (["scared", "afraid", "help", "danger"], "GENERAL_DANGER", 5, "feels unsafe and scared"),
-        ]
-
-        for keywords, scenario, level, description in scenarios:
-            if any(k in text_lower for k in keywords):
-                ctx.detected_scenario = scenario
-                ctx.threat_level = max(ctx.threat_level, level)
-                user_name = UserProfile.get_name()
-                ctx.situation_summary = f"{user_name} {description}"
-                break
-
-        if any(w in text_lower for w in ["gun", "knife", "weapon"]):
+        hits = {m.lastindex for m in _SCENARIO_RE.finditer(text)}
+        if hits:
+            # Earlier entries in _SCENARIOS take priority, as before
+            _, scenario, level, description = _SCENARIOS[min(hits) - 1]
+            ctx.detected_scenario = scenario
+            ctx.threat_level = max(ctx.threat_level, level)
+            user_name = UserProfile.get_name()
+            ctx.situation_summary = f"{user_name} {description}"
+
+        if _WEAPON_RE.search(text):
             ctx.key_facts["weapons"] = "Weapon mentioned"
             ctx.threat_level = min(10, ctx.threat_level + 2)
             if ctx.situation_summary:
                 ctx.situation_summary += ". Weapon may be involved"
 
-        if any(w in text_lower for w in ["hurt", "bleeding", "injured"]):
-            ctx.key_facts["injuries"] = "Injury reported"
+        # Flags already on record can't change, so skip their scans
+        facts = ctx.key_facts
+        if not facts["injuries"] and _INJURY_RE.search(text):
+            facts["injuries"] = "Injury reported"
 
-        if "i'm fine" in text_lower and ctx.threat_level > 5:
-            ctx.key_facts["coercion_detected"] = True
+        if not facts["coercion_detected"] and ctx.threat_level > 5 and _IM_FINE_RE.search(text):
+            facts["coercion_detected"] = True
 
         if not ctx.situation_summary:
             user_msgs = [m["content"] for m in ctx.messages[-3:] if m["role"] == "user"]
@@ -6,105 +6,137 @@ a live AI phone call to the primary contact via Twilio.
 """
 
 import os
+import asyncio
 from typing import List, Dict
 
-try:
-    from twilio.rest import Client as TwilioClient
-except ImportError:
-    TwilioClient = None
+import httpx
 
-from models import CalyxState, UserProfile, LocationStore
+from models import CalyxState, UserProfile
+from .http_client import get_http_client
 
 
 class GuardianRelay:
-    def __init__(self, state: CalyxState):
+    def __init__(self, state: CalyxState, session_id: str = None):
         self.state = state
         self.sid = os.getenv("TWILIO_ACCOUNT_SID")
         self.token = os.getenv("TWILIO_AUTH_TOKEN")
         self.from_num = os.getenv("TWILIO_PHONE_NUMBER")
         self.ngrok_domain = os.getenv("NGROK_DOMAIN")
-        self.client = TwilioClient(self.sid, self.token) if (self.sid and TwilioClient) else None
+        self.domain = (self.ngrok_domain or "").removeprefix("https://").removeprefix("http://").strip("/")
+        # The session id comes back in the stream's "start" event, linking the
+        # call to the browser session that placed it
+        session_param = f'<Parameter name="session" value="{session_id}" />' if session_id else ""
+        self.stream_twiml = (
+            f'<Response><Connect><Stream url="wss://{self.domain}/ws/twilio">'
+            f'{session_param}</Stream></Connect></Response>'
+        )
+        # Twilio REST calls go over the shared pooled client, so an SOS reuses
+        # a warm TLS connection and never blocks the event loop
+        self.enabled = bool(self.sid and self.token)
+        self.http = get_http_client()
+        self._api_base = f"https://api.twilio.com/2010-04-01/Accounts/{self.sid}"
+        self._auth = httpx.BasicAuth(self.sid, self.token) if self.enabled else None
         self.first_responder_call_sid = None
 
+    async def _send_sms(self, to: str, body: str):
+        r = await self.http.post(
+            f"{self._api_base}/Messages.json",
+            data={"From": self.from_num, "To": to, "Body": body},
+            auth=self._auth,
+        )
+        r.raise_for_status()
+
+    async def _place_call(self, to: str, twiml: str) -> str:
+        r = await self.http.post(
+            f"{self._api_base}/Calls.json",
+            data={"From": self.from_num, "To": to, "Twiml": twiml},
+            auth=self._auth,
+        )
+        r.raise_for_status()
+        return r.json().get("sid")
+
+    async def _sms_contact(self, contact: Dict, sms_body: str):
+        phone = contact.get("phone", "").strip()
+        name = contact.get("name", "Contact")
+        if phone:
+            await self._send_sms(phone, f"Hi {name},\n\n{sms_body}")
+            print(f"[GUARDIAN] SMS sent to {name}: {phone}")
+
+    async def _auto_call(self, contact: Dict, user_name: str):
+        phone = contact.get("phone", "").strip()
+        name = contact.get("name", "")
+        if phone:
+            auto_msg = f"This is Calyx emergency system. {user_name} has triggered an emergency alert. Please check your SMS for details and location. Another contact is being connected to the AI system for more information."
+            auto_twiml = f'<Response><Say voice="alice">{auto_msg}</Say></Response>'
+            await self._place_call(phone, auto_twiml)
+            print(f"[GUARDIAN] Auto-call to {name}: {phone}")
+
+    async def _call_contacts(self, contacts: List[Dict], user_name: str):
+        """Connect the first contact to the AI, then auto-call the rest together."""
+        first_contact = contacts[0]
+        phone = first_contact.get("phone", "").strip()
+        if not phone:
+            return
+        self.first_responder_call_sid = await self._place_call(phone, self.stream_twiml)
+        self.state.conversation_context.first_responder = first_contact.get("name")
+        print(f"[GUARDIAN] Calling {first_contact.get('name')}: {phone}")
+
+        for result in await asyncio.gather(
+            *(self._auto_call(contact, user_name) for contact in contacts[1:]),
+            return_exceptions=True,
+        ):
+            if isinstance(result, Exception):
+                print(f"[GUARDIAN] Auto-call error: {result}")
+
     async def trigger_emergency_protocol(self, contacts: List[Dict] = None):
         if self.state.call_active:
             print(">>> [GUARDIAN] Call already active.")
             return
 
         self.state.call_active = True
+        self.first_responder_call_sid = None
 
-        if not contacts:
-            env_contact = os.getenv("EMERGENCY_CONTACT_NUMBER")
-            if env_contact:
-                contacts = [{"name": "Emergency Contact", "phone": env_contact}]
+        try:
+            if not contacts:
+                env_contact = os.getenv("EMERGENCY_CONTACT_NUMBER")
+                if env_contact:
+                    contacts = [{"name": "Emergency Contact", "phone": env_contact}]
+                else:
+                    contacts = []
+
+            if not contacts:
+                print(">>> [GUARDIAN] No contacts configured")
+                return
+
+            user_name = UserProfile.get_name()
+
+            print(f"[GUARDIAN] Emergency protocol: alerting {len(contacts)} contact(s)")
+
+            sms_body = self.state.conversation_context.generate_sms_briefing()
+
+            if self.enabled:
+                # SMS to every contact and the primary call go out concurrently, so
+                # alerting N contacts costs about one Twilio round trip, not N
+                jobs = [self._sms_contact(contact, sms_body) for contact in contacts]
+                if self.domain:
+                    jobs.append(self._call_contacts(contacts, user_name))
+                for result in await asyncio.gather(*jobs, return_exceptions=True):
+                    if isinstance(result, Exception):
+                        print(f"[GUARDIAN] Error: {result}")
             else:
-                contacts = []
-
-        if not contacts:
-            print(">>> [GUARDIAN] No contacts configured")
-            return
-
-        user_name = UserProfile.get_name()
-        lat, lng = LocationStore.get_coords()
-
-        print(f"[GUARDIAN] Emergency protocol: alerting {len(contacts)} contact(s)")
-
-        sms_body = self.state.conversation_context.generate_sms_briefing(lat, lng)
-
-        if self.client:
-            try:
-                for contact in contacts:
-                    phone = contact.get("phone", "").strip()
-                    name = contact.get("name", "Contact")
-                    if phone:
-                        personalized_sms = f"Hi {name},\n\n{sms_body}"
-                        self.client.messages.create(
-                            body=personalized_sms,
-                            from_=self.from_num,
-                            to=phone
-                        )
-                        print(f"[GUARDIAN] SMS sent to {name}: {phone}")
-
-                if contacts and self.ngrok_domain:
-                    first_contact = contacts[0]
-                    phone = first_contact.get("phone", "").strip()
-                    if phone:
-                        domain = self.ngrok_domain.replace("https://", "").replace("http://", "").strip("/")
-                        twiml = f'<Response><Connect><Stream url="wss://{domain}/ws/twilio" /></Connect></Response>'
-                        call = self.client.calls.create(
-                            twiml=twiml,
-                            to=phone,
-                            from_=self.from_num
-                        )
-                        self.first_responder_call_sid = call.sid
-                        self.state.conversation_context.first_responder = first_contact.get("name")
-                        print(f"[GUARDIAN] Calling {first_contact.get('name')}: {phone}")
-
-                        for contact in contacts[1:]:
-                            phone = contact.get("phone", "").strip()
-                            name = contact.get("name", "")
-                            if phone:
-                                auto_msg = f"This is Calyx emergency system. {user_name} has triggered an emergency alert. Please check your SMS for details and location. Another contact is being connected to the AI system for more information."
-                                auto_twiml = f'<Response><Say voice="alice">{auto_msg}</Say></Response>'
-                                self.client.calls.create(
-                                    twiml=auto_twiml,
-                                    to=phone,
-                                    from_=self.from_num
-                                )
-                                print(f"[GUARDIAN] Auto-call to {name}: {phone}")
-
-            except Exception as e:
-                print(f"[GUARDIAN] Error: {e}")
+                print(f"[GUARDIAN] Simulation mode - SMS: {sms_body[:100]}...")
+        finally:
+            # Only a placed AI call keeps the flag; its Twilio stream clears it
+            # at hang-up. SMS-only, simulated, failed or cancelled alerts let the
+            # next SOS retry.
+            if not self.first_responder_call_sid:
                 self.state.call_active = False
-        else:
-            print(f"[GUARDIAN] Simulation mode - SMS: {sms_body[:100]}...")
 
     async def send_evidence_link(self, filename, contacts: List[Dict] = None):
-        if not self.client or not self.ngrok_domain or not filename:
+        if not self.enabled or not self.domain or not filename:
             return
 
-        domain = self.ngrok_domain.replace("https://", "").replace("http://", "").strip("/")
-        link = f"https://{domain}/static/{filename}"
+        link = f"https://{self.domain}/static/{filename}"
 
         if not contacts:
             env_contact = os.getenv("EMERGENCY_CONTACT_NUMBER")
@@ -115,10 +147,6 @@ class GuardianRelay:
             phone = contact.get("phone", "").strip()
             if phone:
                 try:
-                    self.client.messages.create(
-                        body=f"CALYX INCIDENT REPORT: {link}",
-                        from_=self.from_num,
-                        to=phone
-                    )
+                    await self._send_sms(phone, f"CALYX INCIDENT REPORT: {link}")
                 except:
                     pass
@@ -0,0 +1,33 @@
+"""
+Shared outbound HTTP client.
+
+One pooled HTTP/2 client serves every session's Groq and Murf requests,
+so they reuse keep-alive connections instead of paying a TLS handshake
+per session.
+"""
+
+import httpx
+
+_http_client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(10.0, connect=3.0),
+            # httpx drops idle connections after 5s by default, so any pause in
+            # a conversation longer than that cost a fresh handshake on the
+            # next Groq/Murf request
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=120.0),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared client. Called once at app shutdown."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
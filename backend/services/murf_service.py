@@ -1,9 +1,8 @@
 """
 Murf Falcon Text-to-Speech service.
 
-Uses two Murf API endpoints:
-  - /v1/speech/stream  (Falcon model) for ultra-low-latency browser audio
-  - /v1/speech/generate for phone-quality WAV output (Twilio)
+Uses the Murf /v1/speech/stream endpoint (Falcon model) for both
+ultra-low-latency browser MP3 audio and 8kHz phone WAV output (Twilio).
 
 Voice profiles (style, rate, pitch) are dynamically read from CalyxState,
 enabling real-time voice switching across crisis modes without re-init.
@@ -13,83 +12,241 @@ import os
 import re
 import time
 import asyncio
-import httpx
+import logging
 from typing import AsyncGenerator
 
+import orjson
+
 from models import CalyxState
+from .http_client import get_http_client
+from .response_cache import ResponseCache
+
+# Per-sentence lines are DEBUG, so at the default INFO level they are never
+# formatted
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = frozenset(".?!")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+# Phone TTS flush points: a sentence end followed by a space (or the end of the
+# buffer), or a clause break for the opening segment of a reply
+_SENTENCE_BREAK_RE = re.compile(r"[.?!](?=\s|$)")
+_CLAUSE_BREAK_RE = re.compile(r"[,;:](?=\s)")
+_BREAK_CHARS = frozenset(".?!,;:")
+_MIN_PHONE_CHARS = 20
+_FIRST_CLAUSE_CHARS = 40
+_MAX_PHONE_CHARS = 160
+_WAV_HEADER_BYTES = 44
+_WAV_HEADER_SCAN = 512
+
+# Phone requests differ only in text, so the rest of the JSON body is
+# serialized once
+_PHONE_BODY_PREFIX = orjson.dumps({
+    "voiceId": "en-US-natalie",
+    "style": "Conversational",
+    "rate": 5,
+    "pitch": 0,
+    "model": "FALCON",
+    "sampleRate": 8000,
+    "format": "WAV",
+    "channelType": "MONO",
+})[:-1] + b',"text":'
+
+# Control tags that slipped through to TTS, bracketed or not
+_INLINE_TAG_RE = re.compile(r"\[?(?:MODE:\w+(?::\w+)?|SIGNAL:\w+)\]?\s*", re.IGNORECASE)
+# False capability claims the LLM might generate, as one alternation
+_HALLUCINATION_RE = re.compile("|".join((
+    r"(?:I'm |I am |I will |I can |I'll |let me |going to )(?:track|locate|find|trace|ping|monitor|watch|see|view|access|hack|unlock|control|dispatch|send (?:police|ambulance|help)|call (?:911|police|ambulance|emergency services))",
+    r"(?:tracking|locating|finding|tracing|pinging|monitoring|dispatching|sending help)",
+    r"(?:I've |I have )(?:sent|dispatched|called|alerted) (?:police|ambulance|emergency services|911|help)",
+    r"authorities (?:are|have been) (?:notified|alerted|dispatched|on (?:the |their )?way)",
+    r"help is on the way",
+    r"I(?:'m| am) (?:alerting|contacting|calling) (?:emergency services|police|911)",
+)), re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+_SPACE_BEFORE_PUNCT_RE = re.compile(r"\s+([.,!?])")
+
+# Marks the end of one item's output in MurfService._pipeline
+_ITEM_END = object()
+
+# Browser MP3 per (voice settings, sentence). Replayed opening replies and
+# stock lines ("I'm here.") then skip synthesis entirely.
+_audio_cache = ResponseCache(maxsize=128, ttl=3600.0)
+
+
+def _iter_sentences(text: str):
+    """Yield the sentences of `text` lazily, without building a split list."""
+    pos = 0
+    for m in _SENTENCE_SPLIT_RE.finditer(text):
+        yield text[pos:m.start()]
+        pos = m.end()
+    if tail := text[pos:]:
+        yield tail
+
+
+async def warm_up_murf():
+    """Open a pooled connection to Murf without synthesizing anything.
+
+    Any response will do (the stream endpoint rejects HEAD); the point is the
+    TLS handshake, so the first sentence of a session skips it.
+    """
+    await get_http_client().head("https://api.murf.ai/v1/speech/stream", timeout=5.0)
 
 
 class MurfService:
     def __init__(self, state: CalyxState):
         self.api_key = os.getenv("MURF_API_KEY")
         self.stream_url = "https://api.murf.ai/v1/speech/stream"
-        self.generate_url = "https://api.murf.ai/v1/speech/generate"
         self.state = state
-        self.http = httpx.AsyncClient(timeout=httpx.Timeout(12.0, connect=2.0), http2=True)
+        self.http = get_http_client()
+        self._headers = {"api-key": self.api_key, "Content-Type": "application/json"}
 
     async def stream_audio(self, text_stream: AsyncGenerator[str, None]) -> AsyncGenerator[bytes, None]:
-        """Collect full LLM response, then stream audio sentence by sentence."""
-        full_text = ""
-
-        async for chunk in text_stream:
-            if isinstance(chunk, bytes):
-                yield chunk  # Pass through signal bytes (SIGNAL_CALL, etc.)
-                continue
-            full_text += chunk
+        """Stream audio sentence by sentence while the LLM response is still arriving.
 
-        if self.state.interrupted or not full_text.strip():
-            return
-
-        clean_text = full_text.strip()
-        sentences = re.split(r'(?<=[.!?])\s+', clean_text)
+        Each sentence goes to TTS as soon as the next one starts, instead of
+        after the whole reply. Signal bytes (SIGNAL_CALL, etc.) are passed
+        through the moment they are parsed, without waiting for any audio.
+        """
+        # Signals and finished clips share one queue; None ends the reply
+        out = asyncio.Queue()
 
-        for sentence in sentences:
+        def finish(sentence):
             sentence = sentence.strip()
-            if not sentence or len(sentence) < 3:
-                continue
-            if sentence[-1] not in '.!?':
+            if len(sentence) < 3:
+                return None
+            if sentence[-1] not in _SENTENCE_END:
                 sentence += '.'
+            return sentence
 
-            audio, duration = await self._gen_audio_with_duration(sentence)
-            if audio:
-                yield audio
-                await asyncio.sleep(duration + 0.1)
+        async def sentences():
+            buffer = ""
+            async for chunk in text_stream:
+                if isinstance(chunk, bytes):
+                    out.put_nowait(chunk)
+                    continue
+                # Only the unfinished tail is kept, so the scan stays short
+                buffer += chunk
+                pos = 0
+                for m in _SENTENCE_SPLIT_RE.finditer(buffer):
+                    if self.state.interrupted:
+                        return
+                    if sentence := finish(buffer[pos:m.start()]):
+                        yield sentence
+                    pos = m.end()
+                buffer = buffer[pos:]
+            if not self.state.interrupted and (sentence := finish(buffer)):
+                yield sentence
 
-    async def _gen_audio_with_duration(self, text: str) -> tuple:
-        """Generate audio via Falcon streaming and estimate playback duration."""
-        clean = text.strip()
-        if not clean:
-            return None, 0
+        async def gen_one(sentence):
+            yield await self._gen_audio_with_duration(sentence)
 
-        clean = re.sub(r'\[?MODE:\w+(?::\w+)?\]?\s*', '', clean, flags=re.I)
-        clean = re.sub(r'\[?SIGNAL:\w+\]?\s*', '', clean, flags=re.I)
-        clean = clean.strip()
+        # Audio is sent as soon as it is ready: the browser queues clips and
+        # plays them back to back, and a barge-in clears that queue
+        async def synthesize():
+            try:
+                async for result in self._pipeline(sentences(), gen_one):
+                    if result is not _ITEM_END and result[0]:
+                        out.put_nowait(result[0])
+            finally:
+                out.put_nowait(None)
 
-        if len(clean) < 2:
-            return None, 0
+        task = asyncio.create_task(synthesize())
+        try:
+            while (data := await out.get()) is not None:
+                yield data
+                if self.state.interrupted:
+                    return
+            # Surface an error from the LLM stream or the pipeline
+            await task
+        finally:
+            task.cancel()
+
+    async def _pipeline(self, items, gen, depth: int = 4):
+        """Run async generator `gen` over items with up to `depth` in flight.
+
+        `items` may be a list or an async iterable, such as segments cut from
+        a live LLM stream. Each item's output is yielded in order as it
+        arrives, followed by _ITEM_END, so later items generate while earlier
+        ones are consumed.
+        """
+        order = asyncio.Queue()
+        slots = asyncio.Semaphore(depth)
+        tasks = []
 
-        clean = self._filter_hallucinations(clean)
+        async def pump(item, queue):
+            try:
+                async for out in gen(item):
+                    queue.put_nowait(out)
+            finally:
+                queue.put_nowait(_ITEM_END)
+
+        async def start(item):
+            await slots.acquire()
+            queue = asyncio.Queue()
+            tasks.append(asyncio.create_task(pump(item, queue)))
+            order.put_nowait(queue)
+
+        async def feed():
+            try:
+                if hasattr(items, "__aiter__"):
+                    async for item in items:
+                        await start(item)
+                else:
+                    for item in items:
+                        await start(item)
+            finally:
+                order.put_nowait(None)
+
+        feeder = asyncio.create_task(feed())
+        try:
+            while (queue := await order.get()) is not None:
+                while True:
+                    out = await queue.get()
+                    yield out
+                    if out is _ITEM_END:
+                        break
+                slots.release()
+            # Surface an error from the item source, e.g. a failed LLM stream
+            await feeder
+        finally:
+            feeder.cancel()
+            for task in tasks:
+                task.cancel()
+
+    async def _gen_audio_with_duration(self, text: str) -> tuple:
+        """Generate audio via Falcon streaming and estimate playback duration."""
+        # Tags out, then the hallucination filter collapses and trims
+        # whitespace, so the sentence is only stripped once
+        clean = self._filter_hallucinations(_INLINE_TAG_RE.sub("", text))
         if len(clean) < 2:
             return None, 0
 
         t0 = time.time()
+        # The profile can switch mid-reply; read it once for this sentence
         profile = self.state.voice_profile
+        voice_id, style, rate, pitch = profile["voice_id"], profile["style"], profile["rate"], profile["pitch"]
+
+        cache_key = (voice_id, style, rate, pitch, clean)
+        cached = _audio_cache.get(cache_key)
+        if cached:
+            logger.debug("[MURF] Cache hit (%.0f%%): %.30s...", _audio_cache.hit_rate * 100, clean)
+            return cached
 
         try:
             async with self.http.stream(
                 "POST",
                 self.stream_url,
-                json={
+                content=orjson.dumps({
                     "text": clean,
-                    "voiceId": profile["voice_id"],
-                    "style": profile["style"],
-                    "rate": profile["rate"],
-                    "pitch": profile["pitch"],
+                    "voiceId": voice_id,
+                    "style": style,
+                    "rate": rate,
+                    "pitch": pitch,
                     "model": "FALCON",
                     "format": "MP3",
                     "sampleRate": 24000,
-                },
-                headers={"api-key": self.api_key, "Content-Type": "application/json"}
+                }),
+                headers=self._headers
             ) as r:
                 if r.status_code == 200:
                     chunks = [c async for c in r.aiter_bytes()]
@@ -97,34 +254,22 @@ class MurfService:
                     latency = int((time.time() - t0) * 1000)
                     self.state.add_latency_sample(latency)
 
-                    rate_factor = 1.0 - (profile["rate"] / 100)
-                    chars_per_sec = 12.5 * rate_factor
-                    duration = len(clean) / chars_per_sec
+                    duration = len(clean) / (12.5 * (1.0 - rate / 100))
 
-                    print(f"[MURF] {latency}ms ({duration:.1f}s): {clean[:30]}...")
+                    logger.debug("[MURF] %dms (%.1fs): %.30s...", latency, duration, clean)
+                    if audio:
+                        _audio_cache.put(cache_key, (audio, duration))
                     return audio, duration
         except Exception as e:
-            print(f"[MURF] Error: {e}")
+            logger.warning("[MURF] Error: %s", e)
         return None, 0
 
     def _filter_hallucinations(self, text: str) -> str:
         """Remove false capability claims the LLM might generate."""
-        hallucination_patterns = [
-            r"(?:I'm |I am |I will |I can |I'll |let me |going to )(?:track|locate|find|trace|ping|monitor|watch|see|view|access|hack|unlock|control|dispatch|send (?:police|ambulance|help)|call (?:911|police|ambulance|emergency services))",
-            r"(?:tracking|locating|finding|tracing|pinging|monitoring|dispatching|sending help)",
-            r"(?:I've |I have )(?:sent|dispatched|called|alerted) (?:police|ambulance|emergency services|911|help)",
-            r"authorities (?:are|have been) (?:notified|alerted|dispatched|on (?:the |their )?way)",
-            r"help is on the way",
-            r"I(?:'m| am) (?:alerting|contacting|calling) (?:emergency services|police|911)",
-        ]
-
-        filtered = text
-        for pattern in hallucination_patterns:
-            filtered = re.sub(pattern, "", filtered, flags=re.IGNORECASE)
-
-        filtered = re.sub(r'\s+', ' ', filtered).strip()
-        filtered = re.sub(r'\s+([.,!?])', r'\1', filtered)
-        return filtered if filtered else text
+        filtered = _HALLUCINATION_RE.sub("", text)
+        filtered = _WHITESPACE_RE.sub(" ", filtered).strip()
+        filtered = _SPACE_BEFORE_PUNCT_RE.sub(r"\1", filtered)
+        return filtered if filtered else text.strip()
 
     async def generate_phone_audio(self, text: str) -> AsyncGenerator[bytes, None]:
         """Generate 8kHz WAV audio for Twilio phone calls, sentence by sentence."""
@@ -132,43 +277,115 @@ class MurfService:
         if not clean:
             return
 
-        sentences = re.split(r'(?<=[.!?])\s+', clean)
+        batch = (sen for sen in map(str.strip, _iter_sentences(clean)) if len(sen) >= 3)
 
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence or len(sentence) < 3:
+        spoke = False
+        async for pcm in self._pipeline(batch, self._stream_phone_pcm):
+            if pcm is _ITEM_END:
+                if spoke:
+                    await asyncio.sleep(0.25)
+                spoke = False
                 continue
+            spoke = True
+            yield pcm
 
-            t0 = time.time()
-            try:
-                r = await self.http.post(
-                    self.generate_url,
-                    json={
-                        "voiceId": "en-US-natalie",
-                        "style": "Conversational",
-                        "text": sentence,
-                        "rate": 5,
-                        "pitch": 0,
-                        "sampleRate": 8000,
-                        "format": "WAV",
-                        "channelType": "MONO"
-                    },
-                    headers={
-                        "api-key": self.api_key,
-                        "Content-Type": "application/json",
-                        "Accept": "application/json"
-                    }
-                )
-                if r.status_code == 200:
-                    data = r.json()
-                    if data.get("audioFile"):
-                        wav = await self.http.get(data["audioFile"])
-                        pcm = wav.content[44:] if len(wav.content) > 44 else wav.content
-                        print(f"[MURF Phone] {int((time.time()-t0)*1000)}ms: {sentence[:30]}...")
-                        yield pcm
-                        await asyncio.sleep(0.25)
-            except Exception as e:
-                print(f"[MURF Phone] Error: {e}")
-
-    async def close(self):
-        await self.http.aclose()
+    async def stream_phone_audio(self, text_stream: AsyncGenerator[str, None]) -> AsyncGenerator[bytes, None]:
+        """Speak an LLM stream on a phone call, flushing to TTS at sentence boundaries.
+
+        Short sentences are coalesced until the buffer passes 20 chars, so
+        fillers like "Okay." ride along with the next sentence in one request.
+        The opening segment may flush at a clause break once it passes 40
+        chars so the first audio starts sooner, and a run-on buffer is cut at
+        a word break past 160 chars.
+        """
+        async def segments():
+            parts = []
+            size = 0
+            spoke = False
+
+            async for chunk in text_stream:
+                if isinstance(chunk, bytes):
+                    continue
+                parts.append(chunk)
+                size += len(chunk)
+                if size <= _MIN_PHONE_CHARS:
+                    continue
+                if size < _MAX_PHONE_CHARS and _BREAK_CHARS.isdisjoint(chunk):
+                    continue
+
+                buffer = "".join(parts)
+                cut = 0
+                for m in _SENTENCE_BREAK_RE.finditer(buffer):
+                    cut = m.end()
+                if cut <= _MIN_PHONE_CHARS and not spoke and size >= _FIRST_CLAUSE_CHARS:
+                    for m in _CLAUSE_BREAK_RE.finditer(buffer):
+                        cut = m.end()
+                if cut <= _MIN_PHONE_CHARS and size >= _MAX_PHONE_CHARS:
+                    cut = buffer.rfind(" ") + 1
+                if cut <= _MIN_PHONE_CHARS:
+                    parts = [buffer]
+                    continue
+
+                text = buffer[:cut].strip()
+                rest = buffer[cut:]
+                parts = [rest] if rest else []
+                size = len(rest)
+                spoke = True
+                logger.info("[Phone AI]: %s", text)
+                yield text
+
+            text = "".join(parts).strip()
+            if text:
+                logger.info("[Phone AI]: %s", text)
+                yield text
+
+        # The next segment is synthesized while the current one is still
+        # streaming to the call
+        async for pcm in self._pipeline(segments(), self.generate_phone_audio, depth=2):
+            if pcm is not _ITEM_END:
+                yield pcm
+
+    async def _stream_phone_pcm(self, sentence: str) -> AsyncGenerator[bytes, None]:
+        """Stream one sentence of 8kHz phone PCM as Murf sends it.
+
+        The WAV header, up to the data chunk, is dropped from the front of the
+        stream, and chunks are kept to whole 16-bit samples so each one can be
+        mu-law encoded alone. Chunks are memoryviews over the received bytes.
+        """
+        t0 = time.time()
+        header = True
+        carry = b""
+        try:
+            async with self.http.stream(
+                "POST",
+                self.stream_url,
+                content=_PHONE_BODY_PREFIX + orjson.dumps(sentence) + b"}",
+                headers=self._headers
+            ) as r:
+                if r.status_code != 200:
+                    return
+                async for data in r.aiter_bytes(8192):
+                    if self.state.interrupted:
+                        break
+                    # memoryview slices, so trimming the header or an odd byte
+                    # doesn't copy the chunk
+                    chunk = memoryview(data)
+                    if header:
+                        # The first 8 KiB read holds the whole header. Samples
+                        # start after the "data" chunk's id and size: byte 44
+                        # for a minimal header, later if a LIST chunk precedes it
+                        header = False
+                        idx = data.find(b"data", 12, _WAV_HEADER_SCAN)
+                        chunk = chunk[idx + 8 if idx >= 0 else _WAV_HEADER_BYTES:]
+                    if carry:
+                        # Rare: only after an odd-sized network read
+                        chunk = memoryview(carry + chunk)
+                        carry = b""
+                    if len(chunk) % 2:
+                        carry = bytes(chunk[-1:])
+                        chunk = chunk[:-1]
+                    if chunk:
+                        yield chunk
+                logger.debug("[MURF Phone] %dms: %.30s...", (time.time() - t0) * 1000, sentence)
+        except Exception as e:
+            logger.warning("[MURF Phone] Error: %s", e)
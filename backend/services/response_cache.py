@@ -0,0 +1,54 @@
+"""
+LRU + TTL cache of complete LLM replies and synthesized speech.
+
+Calyx's opening messages cluster into a small set ("help", "I'm scared",
+"can I order a pizza"), so a repeated opener can replay a stored reply
+instead of waiting on another Groq round trip, and a repeated sentence can
+reuse its Murf audio.
+"""
+
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_utterance(text: str) -> str:
+    """Lowercase, drop punctuation, and collapse whitespace."""
+    return " ".join(_PUNCT_RE.sub("", text.lower()).split())
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int = 256, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
@@ -0,0 +1,38 @@
+"""Shared setup for the Murf utility scripts: env loading and a cached voice list."""
+
+import os
+import json
+import time
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', 'backend', '.env'))
+
+# One keep-alive session for every Murf call a script makes
+session = requests.Session()
+session.headers.update({"api-key": os.getenv("MURF_API_KEY"), "Accept": "application/json"})
+
+VOICES_URL = "https://api.murf.ai/v1/speech/voices"
+# The voice library rarely changes, so a day-old copy is good enough here
+VOICES_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "calyx", "murf_voices.json")
+VOICES_TTL = 24 * 3600
+
+
+def get_voices():
+    """Return Murf's voice list, from the local cache if it is less than a day old."""
+    try:
+        if time.time() - os.path.getmtime(VOICES_CACHE) < VOICES_TTL:
+            with open(VOICES_CACHE) as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    response = session.get(VOICES_URL)
+    response.raise_for_status()
+    voices = response.json()
+
+    os.makedirs(os.path.dirname(VOICES_CACHE), exist_ok=True)
+    with open(VOICES_CACHE, "w") as f:
+        json.dump(voices, f)
+    return voices
@@ -1,20 +1,15 @@
 """Check available styles for a specific Murf voice."""
 
 import os
-import requests
-from dotenv import load_dotenv
 
-load_dotenv(os.path.join(os.path.dirname(__file__), '..', 'backend', '.env'))
+from _murf_common import get_voices
 
-URL = "https://api.murf.ai/v1/speech/voices"
-headers = {"api-key": os.getenv("MURF_API_KEY"), "Accept": "application/json"}
 MY_VOICE = os.getenv("MURF_VOICE_ID", "en-US-natalie")
 
 print(f"Checking styles for: {MY_VOICE}")
 
 try:
-    response = requests.get(URL, headers=headers)
-    voices = response.json()
+    voices = get_voices()
 
     found = False
     for v in voices:
@@ -1,19 +1,11 @@
 """Quick connectivity test for the Murf Falcon TTS API."""
 
 import os
-import requests
-from dotenv import load_dotenv
 
-load_dotenv(os.path.join(os.path.dirname(__file__), '..', 'backend', '.env'))
+from _murf_common import session
 
 MURF_URL = "https://api.murf.ai/v1/speech/generate"
 
-headers = {
-    "api-key": os.getenv("MURF_API_KEY"),
-    "Content-Type": "application/json",
-    "Accept": "application/json"
-}
-
 payload = {
     "voiceId": os.getenv("MURF_VOICE_ID", "en-US-natalie"),
     "text": "Calyx systems are online and ready.",
@@ -26,7 +18,7 @@ print(f"Testing Murf Falcon Connection...")
 print(f"Using Voice ID: {payload['voiceId']}")
 
 try:
-    response = requests.post(MURF_URL, json=payload, headers=headers)
+    response = session.post(MURF_URL, json=payload)
 
     if response.status_code == 200:
         print("SUCCESS: Murf Falcon responded!")
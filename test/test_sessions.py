@@ -0,0 +1,142 @@
+"""Session registry test: a closed session's pending call keeps its own context."""
+
+import os
+import sys
+import asyncio
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import main
+from models import CalyxState
+from services import GuardianRelay
+
+
+class SessionRegistryTest(unittest.TestCase):
+    def setUp(self):
+        main.SESSIONS.clear()
+        self.a, self.b = CalyxState(), CalyxState()
+        self.a.update_incident_context("A is being followed")
+        self.b.update_incident_context("B is fine")
+        main.SESSIONS["a"] = self.a
+        main.SESSIONS["b"] = self.b
+
+    def tearDown(self):
+        main.SESSIONS.clear()
+
+    def test_disconnected_session_kept_for_its_call(self):
+        async def countdown():
+            await asyncio.sleep(0.01)
+            self.a.call_active = True  # the relay placed the call
+
+        async def run():
+            # A's browser closes while its SOS countdown is still running
+            main.close_session("a", asyncio.create_task(countdown()))
+            self.assertIs(main.SESSIONS.get("a"), self.a)
+            await asyncio.sleep(0.05)
+
+        asyncio.run(run())
+
+        # The call connects after the disconnect and finds A, not B
+        self.assertIs(main.SESSIONS.get("a"), self.a)
+        self.assertEqual(main.SESSIONS["a"].incident_context, "A is being followed")
+
+        # Hang-up releases A; B is untouched
+        self.a.call_active = False
+        main.release_session("a")
+        self.assertNotIn("a", main.SESSIONS)
+        self.assertIs(main.SESSIONS.get("b"), self.b)
+
+    def test_closed_session_without_call_released(self):
+        main.close_session("a")
+        self.assertNotIn("a", main.SESSIONS)
+
+    def test_open_session_not_released_by_call_end(self):
+        main.release_session("b")
+        self.assertIs(main.SESSIONS.get("b"), self.b)
+
+    def _sos(self, relay, contacts):
+        """Close session A while an SOS countdown runs the relay, then settle."""
+        async def run():
+            main.close_session("a", asyncio.create_task(relay.trigger_emergency_protocol(contacts)))
+            await asyncio.sleep(0.05)
+        asyncio.run(run())
+
+    def test_no_contacts_releases_closed_session(self):
+        relay = GuardianRelay(self.a, "a")
+        with mock.patch.dict(os.environ, {"EMERGENCY_CONTACT_NUMBER": ""}):
+            self._sos(relay, [])
+        self.assertFalse(self.a.call_active)
+        self.assertNotIn("a", main.SESSIONS)
+
+    def test_simulation_releases_closed_session(self):
+        relay = GuardianRelay(self.a, "a")
+        relay.enabled = False
+        self._sos(relay, [{"name": "Mom", "phone": "+15550100"}])
+        self.assertFalse(self.a.call_active)
+        self.assertNotIn("a", main.SESSIONS)
+
+    def test_unanswered_call_released_after_connect_window(self):
+        relay = GuardianRelay(self.a, "a")
+        relay.enabled, relay.domain = True, "calyx.example"
+
+        async def send_sms(to, body):
+            pass
+
+        async def place_call(to, twiml):
+            return "CA123"  # placed, but no stream ever connects
+
+        relay._send_sms, relay._place_call = send_sms, place_call
+
+        async def run():
+            main.close_session("a", asyncio.create_task(
+                relay.trigger_emergency_protocol([{"name": "Mom", "phone": "+15550100"}])))
+            await asyncio.sleep(0.02)
+            self.assertTrue(self.a.call_active)
+            self.assertIs(main.SESSIONS.get("a"), self.a)
+            await asyncio.sleep(0.1)
+
+        with mock.patch.object(main, "CALL_CONNECT_SECONDS", 0.05):
+            asyncio.run(run())
+        self.assertNotIn("a", main.SESSIONS)
+        self.assertIs(main.SESSIONS.get("b"), self.b)
+
+    def test_cancelled_trigger_releases_closed_session(self):
+        relay = GuardianRelay(self.a, "a")
+        relay.enabled, relay.domain = True, "calyx.example"
+
+        async def stalled(*args):
+            await asyncio.sleep(10)  # Twilio still answering at teardown
+
+        relay._send_sms = relay._place_call = stalled
+
+        async def run():
+            inactivity = asyncio.create_task(
+                relay.trigger_emergency_protocol([{"name": "Mom", "phone": "+15550100"}]))
+            await asyncio.sleep(0.01)
+            self.assertTrue(self.a.call_active)
+            main.close_session("a", None, inactivity)
+            inactivity.cancel()
+            await asyncio.sleep(0.01)
+
+        asyncio.run(run())
+        self.assertFalse(self.a.call_active)
+        self.assertNotIn("a", main.SESSIONS)
+
+    def test_kept_until_every_pending_task_is_done(self):
+        async def run():
+            countdown = asyncio.create_task(asyncio.sleep(0.05))
+            inactivity = asyncio.create_task(asyncio.sleep(10))
+            main.close_session("a", countdown, inactivity)
+            inactivity.cancel()
+            await asyncio.sleep(0.01)
+            self.assertIs(main.SESSIONS.get("a"), self.a)
+            await asyncio.sleep(0.06)
+
+        asyncio.run(run())
+        self.assertNotIn("a", main.SESSIONS)
+
+
+if __name__ == "__main__":
+    unittest.main()